@@ -0,0 +1,75 @@
+import hashlib
+from typing import Any, Dict, Optional, Sequence, Tuple, Type
+from loguru import logger
+from pydantic import BaseModel
+from app.config import get_temperature_for_agent
+from app.llm_providers import get_llm
+from app.prompt_cache import uses_cache_breakpoint
+from app.rate_limit import rate_limit_middleware
+
+# (agent_type, model, tool names, prompt version, structured output schema)
+AgentKey = Tuple[str, str, Tuple[str, ...], str, str]
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Short content hash identifying a system prompt revision."""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class AgentRegistry:
+    """Builds each compiled agent once and shares it across requests.
+
+    Compiled LangGraph agents are stateless between invocations, so a single
+    instance per (agent type, model, tools, prompt, output schema) can serve
+    any number of concurrent requests. The underlying chat models come from
+    ``get_llm``, which keeps one client (and connection pool) per model.
+    """
+
+    def __init__(self):
+        self._agents: Dict[AgentKey, Any] = {}
+
+    @staticmethod
+    def make_key(agent_type: str, model_name: str, system_prompt: str,
+                 tools: Sequence[Any] = (), structured_output: Optional[Type[BaseModel]] = None) -> AgentKey:
+        return (
+            agent_type,
+            model_name,
+            tuple(sorted(t.name for t in tools)),
+            prompt_version(system_prompt),
+            structured_output.__name__ if structured_output else "",
+        )
+
+    def get(self, agent_type: str, model_name: str, system_prompt: str,
+            tools: Sequence[Any] = (), structured_output: Optional[Type[BaseModel]] = None):
+        key = self.make_key(agent_type, model_name, system_prompt, tools, structured_output)
+        agent = self._agents.get(key)
+        if agent is None:
+            # the langchain.agents stack is only loaded once the first agent is built
+            from langchain.agents import create_agent
+            from langchain.agents.structured_output import ToolStrategy
+            logger.info(f"Building {agent_type} agent on {model_name} (prompt {key[3]})")
+            agent = create_agent(
+                model=get_llm(model_name, get_temperature_for_agent(agent_type)),
+                tools=list(tools),
+                response_format=ToolStrategy(structured_output) if structured_output else None,
+                # every request to the model, not just every agent run, waits on the rate limits
+                middleware=[rate_limit_middleware(model_name)],
+                # with a cache breakpoint, call_agent sends the system prompt as a cacheable message instead
+                system_prompt=None if uses_cache_breakpoint(model_name) else system_prompt
+            )
+            self._agents[key] = agent
+        return agent
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def clear(self):
+        self._agents.clear()
+
+
+registry = AgentRegistry()
+
+
+def get_agent(agent_type: str, model_name: str, system_prompt: str,
+              tools: Sequence[Any] = (), structured_output: Optional[Type[BaseModel]] = None):
+    return registry.get(agent_type, model_name, system_prompt, tools, structured_output)
@@ -1,57 +1,199 @@
-from langchain.agents import create_agent
-from langchain.agents.structured_output import ToolStrategy
-from langchain.tools import tool
-from app.config import get_model_for_agent, get_temperature_for_agent, get_api_key
-from app.llm_providers import get_llm
-from app.models import FightAnalysis, Card, CardAnalysis
-from typing import List, Dict, Any, Optional
-import requests
+from langchain_core.tools import tool
+from app.agent_registry import get_agent
+from app.card_format import format_card, format_fight
+from app.circuit_breaker import CircuitOpen, get_circuit_breakers, is_provider_error
+from app.config import AGENT_MODELS, REPAIR_SETTINGS, get_fallback_models, get_model_for_agent, get_prompt_budget
+from app.evidence import EVIDENCE_INSTRUCTIONS
+from app.hedging import get_hedger
+from app.metrics import AGENT_CALLS_IN_FLIGHT, MODEL_FALLBACKS, record_agent_call, record_error
+from app.models import AgentEvidence, FightAnalysis, Card, CardAnalysis, Fight
+from app.postprocess import get_post_processor
+from app.prompt_cache import cached_system_message, uses_cache_breakpoint
+from app.rate_limit import rate_limit_waits
+from app.serper import SerperNotConfigured, format_results, get_serper_client
+from app.tokens import check_prompt_budget, estimate_tokens, get_usage_tracker, uncached_input_tokens, usage_from_messages
+from app.tracing import trace_span
+from app.validation import ordered, repair_request, validate_analyses
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple, Type
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import time
 from loguru import logger
 from app.prompts import *
 
+JUDGE_SYSTEM_PROMPT = """
+You are the final judge synthesizing all analyses into a definitive prediction.
+
+Synthesize the following analyses from different experts for each fight on the UFC card.
+"""
+
+RISK_SCORER_SYSTEM_PROMPT = """
+You are an expert risk assessor for UFC fights. Review the current fight analyses and identify additional risk factors that could affect outcomes.
+
+Consider factors like:
+- Fighter form and recent performance
+- Injury history and recovery time
+- Weight cut difficulties
+- Training camp issues
+- Age and experience factors
+- Style matchup concerns
+- Overconfidence indicators
+
+Add relevant risk flags to each analysis while preserving existing ones.
+"""
+
+CONSISTENCY_CHECKER_SYSTEM_PROMPT = """
+You are a consistency checker for UFC fight predictions. Review the analyses for logical consistency and adjust confidence scores as needed.
+
+Consider:
+- Conflicting signals between different analysis aspects
+- Overconfidence in uncertain matchups
+- Underestimation of upsets
+- Risk factors that should reduce confidence
+- Consistency with historical outcomes
+
+Adjust confidence scores (0-100) to better reflect realistic probabilities while maintaining the pick.
+"""
 
 
 # Serper Web Search Tool
-@tool
-def serper_search(query: str) -> str:
+@tool(response_format="content_and_artifact")
+async def serper_search(query: str) -> Tuple[str, List[Dict[str, Any]]]:
     """Search the web for fighter news, injuries, and recent updates using Serper API."""
     try:
         logger.info(f"Serper search for: {query}")
-        api_key = get_api_key("serper")
-        if not api_key:
-            return "Serper API key not configured"
-
-        url = "https://google.serper.dev/search"
-        payload = {
-            "q": query,
-            "num": 5  # Get top 5 results
-        }
-        headers = {
-            'X-API-KEY': api_key,
-            'Content-Type': 'application/json'
-        }
-
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-
-        data = response.json()
-        results = data.get("organic", [])
-
-        # Format search results
-        formatted_results = []
-        for i, result in enumerate(results, 1):
-            title = result.get("title", "")
-            link = result.get("link", "")
-            snippet = result.get("snippet", "")
-            formatted_results.append(f"{i}. {title} - {snippet}\n   {link}")
-
-        results_str = "\n\n".join(formatted_results) if formatted_results else "No results found"
-        logger.info(f"Serper search results: {results_str}")
-        return results_str
-
+        with trace_span("serper_search", "tool", query=query):
+            results = await get_serper_client().search(query)
+        results_str = format_results(results)
+        logger.info(f"Serper search returned {len(results)} results for: {query}")
+        # The model sees the formatted text; the structured results ride along as the artifact
+        return results_str, [r.model_dump() for r in results]
+
+    except SerperNotConfigured as e:
+        return str(e), []
     except Exception as e:
-        logger.error(f"Serper search error: {e}")
-        return f"Search error: {str(e)}"
+        logger.error(f"Serper search error: {e!r}")
+        return f"Search error: {str(e)}", []
+
+ANALYSIS_FAILED_PREFIX = "Analysis failed for"
+
+def is_failed_output(output: str) -> bool:
+    return output.startswith(ANALYSIS_FAILED_PREFIX)
+
+async def ainvoke_agent(agent, payload: Dict[str, Any], span=None) -> Dict[str, Any]:
+    """Invoke a compiled agent without blocking the event loop.
+
+    Uses the agent's native ``ainvoke`` when available and otherwise runs the
+    blocking ``invoke`` in the default executor, so concurrent agents overlap.
+    When the call is traced (``span``), the agent is streamed instead so the
+    provider's time to first token can be recorded on the span.
+    """
+    if span is not None and hasattr(agent, "astream"):
+        return await astream_agent(agent, payload, span)
+    if hasattr(agent, "ainvoke"):
+        return await agent.ainvoke(payload)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, agent.invoke, payload)
+
+async def astream_agent(agent, payload: Dict[str, Any], span) -> Dict[str, Any]:
+    started = time.perf_counter()
+    state = None
+    async for mode, chunk in agent.astream(payload, stream_mode=["messages", "values"]):
+        if mode == "messages" and "ttft_ms" not in span.args:
+            span.args["ttft_ms"] = (time.perf_counter() - started) * 1000
+        elif mode == "values":
+            state = chunk
+    return state
+
+# One set per enclosing track_substitutions block; call_agent adds to all of them
+_substitution_trackers: ContextVar[Tuple[Set[str], ...]] = ContextVar("substitution_trackers", default=())
+
+@contextmanager
+def track_substitutions(collected: Set[str]):
+    """Collect "agent:requested->served" into ``collected`` for every call in this block answered by a
+    fallback or hedge model, so callers can avoid caching it under the requested model."""
+    token = _substitution_trackers.set(_substitution_trackers.get() + (collected,))
+    try:
+        yield collected
+    finally:
+        _substitution_trackers.reset(token)
+
+def note_substitution(agent_type: str, requested: str, served: str):
+    for collected in _substitution_trackers.get():
+        collected.add(f"{agent_type}:{requested}->{served}")
+
+async def call_agent(agent_type: str, model_name: str, system_prompt: str, user_content: str,
+                     tools: Sequence[Any] = (), structured_output: Optional[Type[BaseModel]] = None) -> Dict[str, Any]:
+    """Invoke the shared agent for this configuration.
+
+    Every provider request the agent makes waits on the rate limits (see
+    ``rate_limit_middleware``). Agents listed in AGENT_HEDGING may also be raced against a backup model.
+    If the model fails, or its provider's circuit breaker is open, the call
+    moves down the agent's AGENT_FALLBACKS chain.
+    """
+    estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_content)
+    check_prompt_budget(agent_type, estimated_tokens, get_prompt_budget(agent_type))
+
+    async def call(model: str) -> Dict[str, Any]:
+        breaker = get_circuit_breakers().for_model(model)
+        if not breaker.available():
+            raise CircuitOpen(f"{breaker.provider} circuit is open")
+        agent = get_agent(agent_type, model, system_prompt, tools, structured_output)
+        # Static system prompt first, card-specific content last, so providers can reuse the prefix
+        messages = [{"role": "user", "content": user_content}]
+        if uses_cache_breakpoint(model):
+            messages.insert(0, cached_system_message(system_prompt))
+        if not breaker.allow():
+            raise CircuitOpen(f"{breaker.provider} circuit is open")
+        # rate-limit waits between the run's requests are not provider time
+        waits: List[float] = []
+        token = rate_limit_waits.set(waits)
+        started = time.monotonic()
+        try:
+            with AGENT_CALLS_IN_FLIGHT.labels(agent_type).track_inprogress(), \
+                    trace_span("provider", "provider", model=model) as span:
+                result = await ainvoke_agent(agent, {"messages": messages}, span)
+        except Exception as e:
+            record_error(agent_type, e)
+            if is_provider_error(e):
+                breaker.record(False, time.monotonic() - started - sum(waits))
+            else:
+                # the provider answered; what went wrong (parsing, validation) is not its health
+                breaker.release()
+            raise
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        finally:
+            rate_limit_waits.reset(token)
+        provider_seconds = time.monotonic() - started - sum(waits)
+        breaker.record(True, provider_seconds)
+        if model != model_name:
+            note_substitution(agent_type, model_name, model)
+        usage = usage_from_messages(result["messages"])
+        record_agent_call(agent_type, model, provider_seconds, usage)
+        get_usage_tracker().record(agent_type, model, usage)
+        logger.info(
+            f"{agent_type} on {model}: {usage['input_tokens']} input tokens "
+            f"({usage['cache_read_tokens']} cached, {uncached_input_tokens(usage)} uncached), "
+            f"{usage['output_tokens']} output"
+        )
+        return result
+
+    chain = [model_name] + [m for m in get_fallback_models(agent_type) if m != model_name]
+    last_error: Optional[Exception] = None
+    for position, model in enumerate(chain):
+        if position:
+            reason = "circuit_open" if isinstance(last_error, CircuitOpen) else "error"
+            logger.warning(f"{agent_type}: {chain[position - 1]} unavailable ({last_error}), falling back to {model}")
+            MODEL_FALLBACKS.labels(agent_type, chain[position - 1], model, reason).inc()
+        try:
+            return await get_hedger().run(agent_type, model, estimated_tokens, call)
+        except Exception as e:
+            last_error = e
+    raise last_error
 
 async def run_agent(agent_type: str, system_prompt: str, card: Card, model_override: Optional[str] = None) -> str:
     logger.info(f"Starting {agent_type} agent for {len(card.fights)} fights")
@@ -63,256 +205,229 @@ async def run_agent(agent_type: str, system_prompt: str, card: Card, model_overr
         #     for f in card.fights
         # ])
 
-        # Create agent using the new API
-        agent = create_agent(
-            model=model_name,
-            tools=[],  # No tools for analysis agents
-            response_format=None,  # Text response
-            system_prompt=system_prompt
-        )
-
-        user_content = f"Analyze this UFC card:\n{card}"
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
+        user_content = f"Analyze this UFC card:\n{format_card(card)}"
+        result = await call_agent(agent_type, model_name, system_prompt, user_content)
 
         logger.info(f"Completed {agent_type} agent")
         return result["messages"][-1].content
     except Exception as e:
         logger.error(f"Error in {agent_type} agent: {str(e)}")
-        return f"Analysis failed for {agent_type}: {str(e)}"
-
-async def tape_study_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
-    logger.info(f"Starting tape_study agent (serper: {use_serper})")
+        return f"{ANALYSIS_FAILED_PREFIX} {agent_type}: {str(e)}"
+
+# Analysis agents: system prompt, task phrase and the hint given when web search is enabled
+ANALYSIS_AGENTS = {
+    "tape_study": (
+        TAPE_STUDY_PROMPT,
+        "Analyze this UFC card technical analysis",
+        "You can use the serper_search tool to find recent fight footage analysis, technical breakdowns, and expert commentary about fighters."
+    ),
+    "stats_trends": (
+        STATS_TRENDS_PROMPT,
+        "Analyze this UFC card statistical trends",
+        "You can use the serper_search tool to find recent statistical data, performance trends, and fighter statistics updates."
+    ),
+    "news_weighins": (
+        NEWS_WEIGHINS_PROMPT,
+        "Analyze this UFC card for news and external factors",
+        "You can use the serper_search tool to find recent news about fighters, injuries, weigh-in reports, and training camp updates."
+    ),
+    "style_matchup": (
+        STYLE_MATCHUP_PROMPT,
+        "Analyze this UFC card fighting styles and matchup dynamics",
+        "You can use the serper_search tool to find recent fighter style analysis, matchup predictions, and expert commentary."
+    ),
+    "market_odds": (
+        MARKET_ODDS_PROMPT,
+        "Analyze this UFC card betting odds and market movements",
+        "You can use the serper_search tool to find current odds data, line movements, and market analysis."
+    ),
+}
+
+def analysis_user_content(agent_type: str, card: Card, use_serper: bool = False, structured: bool = False) -> str:
+    _, task, search_hint = ANALYSIS_AGENTS[agent_type]
+    content = f"{task}:\n{format_card(card)}"
+    if use_serper:
+        content += f"\n\n{search_hint}"
+    if structured:
+        content += f"\n{EVIDENCE_INSTRUCTIONS}"
+    return content
+
+def prompt_budget_report(card: Card) -> Dict[str, Dict[str, Any]]:
+    """Estimated prompt tokens per analysis agent for this card, against each agent's budget."""
+    report = {}
+    for agent_type, (system_prompt, _, _) in ANALYSIS_AGENTS.items():
+        user_content = analysis_user_content(agent_type, card, card.use_serper, card.structured_evidence)
+        estimated = estimate_tokens(system_prompt) + estimate_tokens(user_content)
+        budget = get_prompt_budget(agent_type)
+        report[agent_type] = {"estimated_tokens": estimated, "budget": budget, "within_budget": estimated <= budget}
+    return report
+
+async def run_analysis_agent(agent_type: str, card: Card, model_override: Optional[str] = None, use_serper: bool = False,
+                             structured: bool = False) -> str:
+    """Returns the agent's essay, or with ``structured`` its AgentEvidence as a JSON string."""
+    logger.info(f"Starting {agent_type} agent (serper: {use_serper}, structured: {structured})")
     try:
-        model_name = model_override if model_override else get_model_for_agent("tape_study")
+        model_name = model_override if model_override else get_model_for_agent(agent_type)
+        system_prompt = ANALYSIS_AGENTS[agent_type][0]
 
         # Determine tools based on use_serper flag
         tools = [serper_search] if use_serper else []
+        user_content = analysis_user_content(agent_type, card, use_serper, structured)
 
-        # Create agent with conditional tools
-        agent = create_agent(
-            model=model_name,
-            tools=tools,
-            response_format=None,  # Text response
-            system_prompt=TAPE_STUDY_PROMPT
-        )
-
-        if use_serper:
-            user_content = f"Analyze this UFC card technical analysis:\n{card}\n\nYou can use the serper_search tool to find recent fight footage analysis, technical breakdowns, and expert commentary about fighters."
-        else:
-            user_content = f"Analyze this UFC card technical analysis:\n{card}"
+        result = await call_agent(agent_type, model_name, system_prompt, user_content, tools,
+                                  structured_output=AgentEvidence if structured else None)
 
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
-
-        logger.info(f"Completed tape_study agent (serper: {use_serper})")
+        logger.info(f"Completed {agent_type} agent (serper: {use_serper}, structured: {structured})")
+        if structured:
+            return result["structured_response"].model_dump_json()
         return result["messages"][-1].content
     except Exception as e:
-        logger.error(f"Error in tape_study agent: {str(e)}")
-        return f"Analysis failed for tape_study: {str(e)}"
-
-async def stats_trends_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
-    logger.info(f"Starting stats_trends agent (serper: {use_serper})")
-    try:
-        model_name = model_override if model_override else get_model_for_agent("stats_trends")
-
-        # Determine tools based on use_serper flag
-        tools = [serper_search] if use_serper else []
-
-        # Create agent with conditional tools
-        agent = create_agent(
-            model=model_name,
-            tools=tools,
-            response_format=None,  # Text response
-            system_prompt=STATS_TRENDS_PROMPT
-        )
-
-        if use_serper:
-            user_content = f"Analyze this UFC card statistical trends:\n{card}\n\nYou can use the serper_search tool to find recent statistical data, performance trends, and fighter statistics updates."
-        else:
-            user_content = f"Analyze this UFC card statistical trends:\n{card}"
+        logger.error(f"Error in {agent_type} agent: {str(e)}")
+        return f"{ANALYSIS_FAILED_PREFIX} {agent_type}: {str(e)}"
 
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
+async def tape_study_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
+    return await run_analysis_agent("tape_study", card, model_override, use_serper)
 
-        logger.info(f"Completed stats_trends agent (serper: {use_serper})")
-        return result["messages"][-1].content
-    except Exception as e:
-        logger.error(f"Error in stats_trends agent: {str(e)}")
-        return f"Analysis failed for stats_trends: {str(e)}"
+async def stats_trends_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
+    return await run_analysis_agent("stats_trends", card, model_override, use_serper)
 
 async def news_weighins_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
-    logger.info(f"Starting news_weighins agent (serper: {use_serper})")
-    try:
-        model_name = model_override if model_override else get_model_for_agent("news_weighins")
-
-        # Determine tools based on use_serper flag
-        tools = [serper_search] if use_serper else []
-
-        # Create agent with conditional tools
-        agent = create_agent(
-            model=model_name,
-            tools=tools,
-            response_format=None,  # Text response
-            system_prompt=NEWS_WEIGHINS_PROMPT
-        )
-
-        if use_serper:
-            user_content = f"Analyze this UFC card for news and external factors:\n{card}\n\nYou can use the serper_search tool to find recent news about fighters, injuries, weigh-in reports, and training camp updates."
-        else:
-            user_content = f"Analyze this UFC card for news and external factors:\n{card}"
-
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
-
-        logger.info(f"Completed news_weighins agent (serper: {use_serper})")
-        return result["messages"][-1].content
-    except Exception as e:
-        logger.error(f"Error in news_weighins agent: {str(e)}")
-        return f"Analysis failed for news_weighins: {str(e)}"
+    return await run_analysis_agent("news_weighins", card, model_override, use_serper)
 
 async def style_matchup_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
-    logger.info(f"Starting style_matchup agent (serper: {use_serper})")
-    try:
-        model_name = model_override if model_override else get_model_for_agent("style_matchup")
-
-        # Determine tools based on use_serper flag
-        tools = [serper_search] if use_serper else []
-
-        # Create agent with conditional tools
-        agent = create_agent(
-            model=model_name,
-            tools=tools,
-            response_format=None,  # Text response
-            system_prompt=STYLE_MATCHUP_PROMPT
-        )
-
-        if use_serper:
-            user_content = f"Analyze this UFC card fighting styles and matchup dynamics:\n{card}\n\nYou can use the serper_search tool to find recent fighter style analysis, matchup predictions, and expert commentary."
-        else:
-            user_content = f"Analyze this UFC card fighting styles and matchup dynamics:\n{card}"
-
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
-
-        logger.info(f"Completed style_matchup agent (serper: {use_serper})")
-        return result["messages"][-1].content
-    except Exception as e:
-        logger.error(f"Error in style_matchup agent: {str(e)}")
-        return f"Analysis failed for style_matchup: {str(e)}"
+    return await run_analysis_agent("style_matchup", card, model_override, use_serper)
 
 async def market_odds_agent(card: Card, model_override: Optional[str] = None, use_serper: bool = False) -> str:
-    logger.info(f"Starting market_odds agent (serper: {use_serper})")
-    try:
-        model_name = model_override if model_override else get_model_for_agent("market_odds")
-
-        # Determine tools based on use_serper flag
-        tools = [serper_search] if use_serper else []
-
-        # Create agent with conditional tools
-        agent = create_agent(
-            model=model_name,
-            tools=tools,
-            response_format=None,  # Text response
-            system_prompt=MARKET_ODDS_PROMPT
-        )
-
-        if use_serper:
-            user_content = f"Analyze this UFC card betting odds and market movements:\n{card}\n\nYou can use the serper_search tool to find current odds data, line movements, and market analysis."
-        else:
-            user_content = f"Analyze this UFC card betting odds and market movements:\n{card}"
-
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
-
-        logger.info(f"Completed market_odds agent (serper: {use_serper})")
-        return result["messages"][-1].content
-    except Exception as e:
-        logger.error(f"Error in market_odds agent: {str(e)}")
-        return f"Analysis failed for market_odds: {str(e)}"
-
-async def judge_agent(card: Card, tape: str, stats: str, news: str, style: str, market: str, model_override: Optional[str] = None) -> List[FightAnalysis]:
-    logger.info("Starting judge agent")
-    try:
-        model_name = model_override if model_override else get_model_for_agent("judge")
-
-        system_prompt = """
-You are the final judge synthesizing all analyses into a definitive prediction.
-
-Synthesize the following analyses from different experts for each fight on the UFC card.
+    return await run_analysis_agent("market_odds", card, model_override, use_serper)
+
+def missing_inputs_note(missing: List[str]) -> str:
+    if not missing:
+        return ""
+    return f"""
+The following analyses are unavailable for this card: {", ".join(missing)}.
+Base your predictions only on the evidence provided, lower confidence where a missing input would have mattered, and add a risk flag noting the missing analysis.
 """
 
-        # Create agent with structured output
-        agent = create_agent(
-            model=model_name,
-            tools=[],  # No tools for judge
-            response_format=ToolStrategy(CardAnalysis),  # Structured output
-            system_prompt=system_prompt
-        )
-
-        user_content = f"""
-Synthesize these analyses into final predictions:
-
-Tape Study: {tape}
+def analyses_section(tape: str, stats: str, news: str, style: str, market: str) -> str:
+    return f"""Tape Study: {tape}
 Stats & Trends: {stats}
 News/Weigh-ins: {news}
 Style Matchup: {style}
-Market/Odds: {market}
+Market/Odds: {market}"""
 
+async def judge_agent(card: Card, tape: str, stats: str, news: str, style: str, market: str, model_override: Optional[str] = None,
+                      missing: Optional[List[str]] = None) -> List[FightAnalysis]:
+    return await run_judge(f"""
+Synthesize these analyses into final predictions:
+
+{analyses_section(tape, stats, news, style, market)}
+{missing_inputs_note(missing)}
 Provide final analysis for all fights with picks, confidence, path to victory, risk flags, and props.
+""", card, model_override)
+
+async def judge_fight_agent(fight: Fight, analyses: str, model_override: Optional[str] = None,
+                            missing: Optional[List[str]] = None) -> FightAnalysis:
+    """Judge a single fight. Raises on failure so the caller can retry just this fight."""
+    model_name = model_override if model_override else get_model_for_agent("judge")
+    user_content = f"""
+Synthesize these analyses into a final prediction for this fight only:
+{format_fight(fight)}
+
+{analyses}
+{missing_inputs_note(missing)}
+Provide the pick, confidence, path to victory, risk flags, and props for fight_id {fight.fight_id}.
 """
+    result = await call_agent("judge", model_name, JUDGE_SYSTEM_PROMPT, user_content, structured_output=FightAnalysis)
+    return result["structured_response"]
+
+async def judge_evidence_agent(card: Card, evidence: str, model_override: Optional[str] = None,
+                               missing: Optional[List[str]] = None) -> List[FightAnalysis]:
+    """Judge from structured per-fight evidence (see app.evidence.format_evidence) instead of essays."""
+    return await run_judge(f"""
+Synthesize this per-fight evidence from the analysis agents into final predictions.
+Each line is one agent's lean (with strength 0-100), key factors, numeric signals and sources.
+
+{evidence}
+{missing_inputs_note(missing)}
+Provide final analysis for all fights with picks, confidence, path to victory, risk flags, and props.
+""", card, model_override)
+
+async def validate_and_repair(agent_type: str, model_name: str, system_prompt: str, card: Card,
+                              analyses: List[FightAnalysis], context: Optional[str] = None) -> Tuple[List[FightAnalysis], Dict[str, List[str]]]:
+    """Validate a structured answer against the card and re-request only the broken entries.
+
+    Returns the valid entries in card order and the problems left once the
+    REPAIR_SETTINGS attempt budget is spent.
+    """
+    report = validate_analyses(analyses, card)
+    valid = report.valid
+    for attempt in range(REPAIR_SETTINGS["max_attempts"]):
+        if report.ok:
+            break
+        if attempt:
+            await asyncio.sleep(REPAIR_SETTINGS["backoff"] * 2 ** (attempt - 1))
+        logger.warning(f"Repairing {agent_type} output for {list(report.problems)} (attempt {attempt + 1})")
+        broken = card.model_copy(update={"fights": [f for f in card.fights if f.fight_id in report.problems]})
+        try:
+            result = await call_agent(agent_type, model_name, system_prompt, repair_request(card, report, context),
+                                      structured_output=CardAnalysis)
+        except Exception as e:
+            logger.error(f"Repair request for {agent_type} failed: {e}")
+            continue
+        repaired = validate_analyses(result["structured_response"].analyses, broken)
+        valid += repaired.valid
+        # keep the last usable entry for fights the repair did not even return
+        repaired.previous = {**{k: v for k, v in report.previous.items() if k in repaired.problems}, **repaired.previous}
+        report = repaired
+    if report.problems:
+        logger.error(f"{agent_type} output still invalid after repair: {report.problems}")
+    return ordered(valid, card), report.problems
+
+async def run_judge(user_content: str, card: Card, model_override: Optional[str] = None) -> List[FightAnalysis]:
+    logger.info("Starting judge agent")
+    try:
+        model_name = model_override if model_override else get_model_for_agent("judge")
 
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
+        result = await call_agent("judge", model_name, JUDGE_SYSTEM_PROMPT, user_content, structured_output=CardAnalysis)
+        # fights that stay invalid are left out; the pipeline reports them as unjudged
+        analyses, _ = await validate_and_repair(
+            "judge", model_name, JUDGE_SYSTEM_PROMPT, card, result["structured_response"].analyses, user_content
+        )
 
         logger.info(f"Judge agent completed with structured response")
-        str_resp_analyses = result["structured_response"].analyses
-        result_json = []
-        for analysis in str_resp_analyses:
-            result_json.append(analysis.dict())
-
-        return result_json
+        return [analysis.model_dump() for analysis in analyses]
     except Exception as e:
         logger.error(f"Error in judge agent: {str(e)}")
         return []
 
 # Post agents - now using LangChain agents
 
-async def risk_scorer_agent(analyses: List[FightAnalysis], model_override: Optional[str] = None) -> List[FightAnalysis]:
+def basic_risk_assessment(analyses: List[FightAnalysis]) -> List[FightAnalysis]:
+    """Rule-based risk flags from the local post-processing engine (no LLM call)."""
+    return get_post_processor().assess_risk(analyses)
+
+def basic_consistency_check(analyses: List[FightAnalysis]) -> List[FightAnalysis]:
+    """Calibrated, risk-discounted confidences from the local post-processing engine (no LLM call)."""
+    return get_post_processor().calibrate(analyses)
+
+async def repaired_post_output(agent_type: str, model_name: str, system_prompt: str, card: Card,
+                               inputs: List[FightAnalysis], outputs: List[FightAnalysis],
+                               fallback_fn, context: str) -> List[FightAnalysis]:
+    """Validate and repair a post agent's answer; fights it still gets wrong get the local treatment instead."""
+    analyses, problems = await validate_and_repair(agent_type, model_name, system_prompt, card, outputs, context)
+    if problems:
+        leftovers = [a.model_copy(deep=True) for a in inputs if a.fight_id in problems]
+        analyses = ordered(analyses + fallback_fn(leftovers), card)
+    logger.info(f"{agent_type} agent completed")
+    return analyses
+
+async def risk_scorer_agent(analyses: List[FightAnalysis], model_override: Optional[str] = None, fallback: bool = True,
+                            card: Optional[Card] = None) -> List[FightAnalysis]:
     """Risk Scorer Agent - enhances risk flags using LLM analysis"""
     logger.info(f"Starting risk scorer agent for {len(analyses)} analyses")
     try:
         model_name = model_override if model_override else get_model_for_agent("risk_scorer")
 
-        system_prompt = """
-You are an expert risk assessor for UFC fights. Review the current fight analyses and identify additional risk factors that could affect outcomes.
-
-Consider factors like:
-- Fighter form and recent performance
-- Injury history and recovery time
-- Weight cut difficulties
-- Training camp issues
-- Age and experience factors
-- Style matchup concerns
-- Overconfidence indicators
-
-Add relevant risk flags to each analysis while preserving existing ones.
-"""
-
-        agent = create_agent(
-            model=model_name,
-            tools=[],  # No tools needed
-            response_format=ToolStrategy(CardAnalysis),  # Structured output
-            system_prompt=system_prompt
-        )
-
         # Serialize current analyses for input
         current_card = CardAnalysis(analyses=analyses)
         analyses_json = current_card.model_dump_json()
@@ -326,49 +441,28 @@ Add any additional risk factors you identify. Preserve existing risk flags and a
 Return the complete updated analysis with enhanced risk assessment.
 """
 
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
+        result = await call_agent("risk_scorer", model_name, RISK_SCORER_SYSTEM_PROMPT, user_content, structured_output=CardAnalysis)
+        if card is not None:
+            return await repaired_post_output("risk_scorer", model_name, RISK_SCORER_SYSTEM_PROMPT, card, current_card.analyses,
+                                              result["structured_response"].analyses, basic_risk_assessment, user_content)
 
         logger.info("Risk scorer agent completed")
         return result["structured_response"].analyses
 
     except Exception as e:
         logger.error(f"Error in risk scorer agent: {str(e)}")
+        if not fallback:
+            raise
         # Fallback to basic risk assessment
-        for analysis in analyses:
-            if analysis.confidence > 90:
-                analysis.risk_flags.append("high confidence may indicate overestimation")
-            if len(analysis.risk_flags) == 0:
-                analysis.risk_flags.append("no major risks identified")
-        return analyses
-
-async def consistency_checker_agent(analyses: List[FightAnalysis], model_override: Optional[str] = None) -> List[FightAnalysis]:
+        return basic_risk_assessment(CardAnalysis(analyses=analyses).analyses)
+
+async def consistency_checker_agent(analyses: List[FightAnalysis], model_override: Optional[str] = None, fallback: bool = True,
+                                    card: Optional[Card] = None) -> List[FightAnalysis]:
     """Consistency Checker Agent - validates and adjusts confidence scores"""
     logger.info(f"Starting consistency checker agent for {len(analyses)} analyses")
     try:
         model_name = model_override if model_override else get_model_for_agent("consistency_checker")
 
-        system_prompt = """
-You are a consistency checker for UFC fight predictions. Review the analyses for logical consistency and adjust confidence scores as needed.
-
-Consider:
-- Conflicting signals between different analysis aspects
-- Overconfidence in uncertain matchups
-- Underestimation of upsets
-- Risk factors that should reduce confidence
-- Consistency with historical outcomes
-
-Adjust confidence scores (0-100) to better reflect realistic probabilities while maintaining the pick.
-"""
-
-        agent = create_agent(
-            model=model_name,
-            tools=[],  # No tools needed
-            response_format=ToolStrategy(CardAnalysis),  # Structured output
-            system_prompt=system_prompt
-        )
-
         # Serialize current analyses for input
         current_card = CardAnalysis(analyses=analyses)
         analyses_json = current_card.model_dump_json()
@@ -382,17 +476,53 @@ Check for logical consistency and adjust confidence scores to reflect realistic
 Maintain the same picks but calibrate confidence appropriately.
 """
 
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_content}]
-        })
+        result = await call_agent("consistency_checker", model_name, CONSISTENCY_CHECKER_SYSTEM_PROMPT, user_content, structured_output=CardAnalysis)
+        if card is not None:
+            return await repaired_post_output("consistency_checker", model_name, CONSISTENCY_CHECKER_SYSTEM_PROMPT, card, current_card.analyses,
+                                              result["structured_response"].analyses, basic_consistency_check, user_content)
 
         logger.info("Consistency checker agent completed")
         return result["structured_response"].analyses
 
     except Exception as e:
         logger.error(f"Error in consistency checker agent: {str(e)}")
+        if not fallback:
+            raise
         # Fallback to basic consistency check
-        for analysis in analyses:
-            if len(analysis.risk_flags) > 1:
-                analysis.confidence = max(50, analysis.confidence - 10)
-        return analyses
+        return basic_consistency_check(CardAnalysis(analyses=analyses).analyses)
+
+def system_prompt_for(agent_type: str) -> str:
+    if agent_type in ANALYSIS_AGENTS:
+        # The task phrasing is part of what the agent is asked, so it versions with the prompt
+        return "\n".join(ANALYSIS_AGENTS[agent_type])
+    return {
+        "judge": JUDGE_SYSTEM_PROMPT,
+        "risk_scorer": RISK_SCORER_SYSTEM_PROMPT,
+        "consistency_checker": CONSISTENCY_CHECKER_SYSTEM_PROMPT,
+    }[agent_type]
+
+def warm_up_agents(include_search: bool = False) -> int:
+    """Pre-build the default AGENT_MODELS agent set so the first request skips graph compilation."""
+    specs = [(agent_type, spec[0], []) for agent_type, spec in ANALYSIS_AGENTS.items()]
+    if include_search:
+        specs += [(agent_type, spec[0], [serper_search]) for agent_type, spec in ANALYSIS_AGENTS.items()]
+    structured = [
+        ("judge", JUDGE_SYSTEM_PROMPT),
+        ("risk_scorer", RISK_SCORER_SYSTEM_PROMPT),
+        ("consistency_checker", CONSISTENCY_CHECKER_SYSTEM_PROMPT),
+    ]
+
+    built = 0
+    for agent_type, system_prompt, tools in specs:
+        try:
+            get_agent(agent_type, AGENT_MODELS[agent_type], system_prompt, tools)
+            built += 1
+        except Exception as e:
+            logger.warning(f"Could not pre-build {agent_type} agent: {e}")
+    for agent_type, system_prompt in structured:
+        try:
+            get_agent(agent_type, AGENT_MODELS[agent_type], system_prompt, structured_output=CardAnalysis)
+            built += 1
+        except Exception as e:
+            logger.warning(f"Could not pre-build {agent_type} agent: {e}")
+    return built
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """In-memory LRU cache with per-entry expiry.
+
+    Entries are evicted least-recently-used first once ``max_size`` is reached,
+    and lazily dropped on read once their TTL has passed.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key, _MISSING)
+        return entry is not _MISSING and (entry[0] is None or entry[0] > time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class SQLiteCache:
+    """Persistent key/value cache in a local SQLite file; values must be JSON-serializable.
+
+    Mirrors the TTLCache interface so either can back a cache. Expiry uses wall
+    clock time so entries survive restarts; expired rows are purged on read and
+    the oldest rows are trimmed once ``max_size`` is exceeded.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_size: int = 10000,
+                 default_ttl: Optional[float] = None):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl if ttl is not None else None, now)
+            )
+            overflow = len(self) - self.max_size
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)", (overflow,)
+                )
+                self.evictions += overflow
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount > 0
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(f"SELECT expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row is not None and (row[0] is None or row[0] > time.time())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+class TieredCache:
+    """Memory LRU in front of a persistent cache; reads fill the memory tier."""
+
+    def __init__(self, memory: TTLCache, persistent: SQLiteCache):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.persistent.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.memory.set(key, value, ttl)
+        self.persistent.set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        in_memory = self.memory.delete(key)
+        return self.persistent.delete(key) or in_memory
+
+    def clear(self):
+        self.memory.clear()
+        self.persistent.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.memory or key in self.persistent
+
+    def __len__(self) -> int:
+        return len(self.persistent)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"memory": self.memory.stats(), "persistent": self.persistent.stats()}
+
+
+def build_cache(backend: str, max_size: int, default_ttl: Optional[float] = None,
+                path: Optional[str] = None, table: str = "cache", disk_max_size: Optional[int] = None):
+    """Cache for ``backend`` "memory" (LRU only) or "sqlite" (LRU in front of SQLite)."""
+    memory = TTLCache(max_size=max_size, default_ttl=default_ttl)
+    if backend == "memory":
+        return memory
+    if backend == "sqlite":
+        persistent = SQLiteCache(path, table=table, max_size=disk_max_size or max_size, default_ttl=default_ttl)
+        return TieredCache(memory, persistent)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight awaitable."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield so one waiter being cancelled does not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+
+        def _done(f: asyncio.Future):
+            if self._inflight.get(key) is f:
+                del self._inflight[key]
+            if not f.cancelled():
+                f.exception()  # mark retrieved even if every waiter went away
+
+        future.add_done_callback(_done)
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
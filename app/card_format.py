@@ -0,0 +1,28 @@
+from typing import List
+from app.models import Card, Fight
+
+# Bump whenever the rendering changes so cached outputs built from the old text are not reused
+CARD_FORMAT_VERSION = "2"
+
+
+def format_fight(fight: Fight) -> str:
+    """One deterministic line per fight; empty fields are left out entirely.
+
+    e.g. ``ufc-312-main: Alexander Volkanovski (25-3-0) vs Ilia Topuria (14-0-0) | Featherweight | 2025-01-18``
+    """
+    def corner(name: str, record: str) -> str:
+        return f"{name} ({record})" if record else name
+
+    parts: List[str] = [
+        f"{fight.fight_id}: {corner(fight.fighter1, fight.fighter1_record)} vs {corner(fight.fighter2, fight.fighter2_record)}",
+        fight.weight_class,
+        fight.date,
+        fight.location,
+        fight.additional_info
+    ]
+    return " | ".join(" ".join(part.split()) for part in parts if part and part.strip())
+
+
+def format_card(card: Card) -> str:
+    """Compact prompt rendering of a card: only the fights, never request options such as models or deadlines."""
+    return "\n".join(format_fight(fight) for fight in card.fights)
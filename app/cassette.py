@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from loguru import logger
+from pydantic import ConfigDict
+from app.config import CASSETTE_SETTINGS
+
+
+class CassetteMiss(RuntimeError):
+    """Replay found no recording for a request."""
+
+
+class ReplayedError(RuntimeError):
+    """A failure that was recorded and is now being replayed.
+
+    Carries the original exception's class name and HTTP status, so code that
+    classifies provider errors (e.g. the circuit breakers) treats the replay
+    like the recorded failure.
+    """
+
+    def __init__(self, message: str, error_type: str, status_code: Optional[int] = None):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+        self.status_code = status_code
+
+
+def error_status_code(error: BaseException) -> Optional[int]:
+    """HTTP status an SDK or httpx exception carries, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)  # google api_core / genai errors
+    return status if isinstance(status, int) and not isinstance(status, bool) else None
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    material = json.dumps({"kind": kind, **request}, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        content = " ".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return " ".join(str(content).split())
+
+
+def normalize_messages(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """What identifies a conversation: roles, text and tool calls, without ids or cache markers."""
+    normalized = []
+    for message in messages:
+        entry: Dict[str, Any] = {"type": message.type, "content": _text(message.content)}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            entry["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in tool_calls]
+        if message.type == "tool":
+            entry["name"] = message.name
+        normalized.append(entry)
+    return normalized
+
+
+class Cassette:
+    """Records provider and Serper request/response pairs to JSONL, or serves them back.
+
+    Each line holds one exchange under a hash of the normalized request, with
+    the response (or the error) and how long it took. Identical requests
+    recorded more than once are replayed in the order they were recorded,
+    the last one repeating. Replay sleeps for the recorded duration, scaled
+    down when ``timing`` is "compressed", so latency profiles carry over.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = settings or CASSETTE_SETTINGS
+        self.mode = self.settings["mode"]
+        self.path = self.settings["path"]
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._served: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            entry = json.loads(line)
+                            entries[entry["key"]].append(entry)
+                        except (ValueError, KeyError):
+                            continue
+            logger.info(f"Loaded {sum(len(v) for v in entries.values())} recorded exchanges from {self.path}")
+            self._entries = entries
+        return self._entries
+
+    def delay(self, seconds: float) -> float:
+        timing = self.settings["timing"]
+        if timing == "none":
+            return 0.0
+        if timing == "compressed":
+            return seconds * self.settings["time_scale"]
+        return seconds
+
+    def _append(self, entry: Dict[str, Any]):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+            self.recorded += 1
+
+    def _next(self, key: str) -> Optional[Dict[str, Any]]:
+        recordings = self.load().get(key)
+        if not recordings:
+            return None
+        index = min(self._served[key], len(recordings) - 1)
+        self._served[key] += 1
+        return recordings[index]
+
+    async def call(self, kind: str, request: Dict[str, Any], fetch: Callable[[], Awaitable[Any]],
+                   encode: Callable[[Any], Any] = lambda value: value,
+                   decode: Callable[[Any], Any] = lambda value: value) -> Any:
+        """Run ``fetch()`` as configured: live, live and recorded, or served from the cassette."""
+        if self.mode not in ("record", "replay"):
+            return await fetch()
+        key = request_key(kind, request)
+
+        if self.replaying:
+            entry = self._next(key)
+            if entry is None:
+                self.misses += 1
+                if self.settings["on_miss"] == "passthrough":
+                    logger.warning(f"No {kind} recording for {key}; calling the live service")
+                    return await fetch()
+                raise CassetteMiss(f"No {kind} recording for request {key} in {self.path}")
+            self.replayed += 1
+            await asyncio.sleep(self.delay(entry["elapsed"]))
+            if "error" in entry:
+                error = entry["error"]
+                raise ReplayedError(error["message"], error["type"], error.get("status_code"))
+            return decode(entry["response"])
+
+        started = time.monotonic()
+        entry = {"key": key, "kind": kind, "request": request, "recorded_at": time.time()}
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = {"type": type(e).__name__, "message": str(e)}
+            status = error_status_code(e)
+            if status is not None:
+                error["status_code"] = status
+            entry.update(elapsed=round(time.monotonic() - started, 4), error=error)
+            self._append(entry)
+            raise
+        entry.update(elapsed=round(time.monotonic() - started, 4), response=encode(result))
+        self._append(entry)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"mode": self.mode, "path": self.path, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+        if self.replaying:
+            stats["timing"] = self.settings["timing"]
+            stats["available"] = sum(len(v) for v in self.load().values())
+        return stats
+
+
+class CassetteChatModel(BaseChatModel):
+    """Wraps a provider chat model so each generation goes through the cassette.
+
+    ``build`` returns the real model and is only called when a request
+    actually has to reach the provider, so replay works without API keys
+    and without importing the provider's package.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model_name: str
+    temperature: float
+    build: Callable[[], Any]
+    tools: List[Any] = []
+    tool_kwargs: Dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools": list(tools), "tool_kwargs": kwargs})
+
+    def inner(self):
+        model = self.build()
+        return model.bind_tools(self.tools, **self.tool_kwargs) if self.tools else model
+
+    def request(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "tools": [convert_to_openai_tool(t) for t in self.tools],
+            "tool_choice": self.tool_kwargs.get("tool_choice"),
+            "messages": normalize_messages(messages)
+        }
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = await get_cassette().call(
+            "llm", self.request(messages), lambda: self.inner().ainvoke(messages, stop=stop, **kwargs),
+            encode=message_to_dict, decode=lambda data: messages_from_dict([data])[0]
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # only reached when something calls the model synchronously; agents use the async path
+        return asyncio.run(self._agenerate(messages, stop=stop, **kwargs))
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette()
+        if _cassette.mode != "off":
+            logger.info(f"Cassette {_cassette.mode} mode using {_cassette.path}")
+    return _cassette
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import httpx
+from loguru import logger
+from app.cassette import error_status_code
+from app.config import CIRCUIT_BREAKER_SETTINGS
+from app.llm_providers import provider_for_model
+from app.metrics import CIRCUIT_STATE
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(RuntimeError):
+    """The provider's breaker is open; the call was not sent."""
+
+
+def is_provider_error(error: BaseException) -> bool:
+    """Whether a failed call says the provider itself is unhealthy: a timeout, a connection failure, 429 or 5xx.
+
+    Provider SDKs are only imported on first use, so their exceptions are
+    recognised by the HTTP status they carry and by class name (the recorded
+    one for a replayed failure). Validation, parsing and prompt errors raised
+    on our side return False.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = error_status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = getattr(error, "error_type", None) or type(error).__name__
+    return any(word in name for word in ("Timeout", "Connect"))
+
+
+class CircuitBreaker:
+    """Error-rate and slow-call breaker for one provider.
+
+    Closed, it keeps the outcome of the last ``window`` calls and opens once
+    at least ``min_calls`` are in and either the failure rate or the share of
+    calls slower than ``slow_call_seconds`` reaches its threshold. Open, it
+    refuses calls for ``open_seconds``, then goes half-open and lets
+    ``half_open_probes`` calls through: if they all succeed it closes again,
+    and any failure reopens it. With breakers disabled every call is allowed.
+    """
+
+    def __init__(self, provider: str, settings: Optional[Dict[str, Any]] = None):
+        self.provider = provider
+        self.settings = settings or CIRCUIT_BREAKER_SETTINGS
+        self.state = CLOSED
+        CIRCUIT_STATE.labels(provider).set(STATE_VALUES[CLOSED])
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=self.settings["window"])  # (failed, slow)
+        self._probes_in_flight = 0
+        self._probes_passed = 0
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.labels(self.provider).set(STATE_VALUES[state])
+
+    def available(self) -> bool:
+        """Cheap check, without taking a probe slot, that a call could be admitted now."""
+        if not self.settings["enabled"] or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            ok = time.monotonic() - self.opened_at >= self.settings["open_seconds"]
+        else:
+            ok = self._probes_in_flight < self.settings["half_open_probes"]
+        if not ok:
+            self.rejected += 1
+        return ok
+
+    def allow(self) -> bool:
+        """Whether a call may go to this provider now; half-open admits a limited number of probes."""
+        if not self.settings["enabled"]:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.settings["open_seconds"]:
+                self.rejected += 1
+                return False
+            self._set_state(HALF_OPEN)
+            self._probes_in_flight = self._probes_passed = 0
+            logger.info(f"Circuit for {self.provider} half-open, probing")
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.settings["half_open_probes"]:
+                self.rejected += 1
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def record(self, ok: bool, seconds: float):
+        if not self.settings["enabled"]:
+            return
+        slow = seconds >= self.settings["slow_call_seconds"]
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if not ok or slow:
+                self._open("probe failed" if not ok else f"probe took {seconds:.1f}s")
+                return
+            self._probes_passed += 1
+            if self._probes_passed >= self.settings["half_open_probes"]:
+                self._set_state(CLOSED)
+                self._outcomes.clear()
+                logger.info(f"Circuit for {self.provider} closed")
+            return
+        if self.state == OPEN:
+            return  # a call admitted before the breaker opened
+        self._outcomes.append((not ok, slow))
+        if len(self._outcomes) < self.settings["min_calls"]:
+            return
+        error_rate, slow_rate = self.rates()
+        if error_rate >= self.settings["error_rate"]:
+            self._open(f"error rate {error_rate:.0%}")
+        elif slow_rate >= self.settings["slow_rate"]:
+            self._open(f"{slow_rate:.0%} of calls over {self.settings['slow_call_seconds']}s")
+
+    def release(self):
+        """A call admitted by ``allow`` ended without an outcome (e.g. it was cancelled)."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def rates(self) -> Tuple[float, float]:
+        if not self._outcomes:
+            return 0.0, 0.0
+        calls = len(self._outcomes)
+        return sum(f for f, _ in self._outcomes) / calls, sum(s for _, s in self._outcomes) / calls
+
+    def _open(self, reason: str):
+        self._set_state(OPEN)
+        self.opened_at = time.monotonic()
+        self.opened_count += 1
+        self._outcomes.clear()
+        logger.warning(f"Circuit for {self.provider} opened ({reason}); routing to fallbacks for {self.settings['open_seconds']}s")
+
+    def stats(self) -> Dict[str, Any]:
+        error_rate, slow_rate = self.rates()
+        stats = {
+            "state": self.state,
+            "calls_in_window": len(self._outcomes),
+            "error_rate": round(error_rate, 3),
+            "slow_rate": round(slow_rate, 3),
+            "opened": self.opened_count,
+            "rejected": self.rejected
+        }
+        if self.state == OPEN:
+            stats["retry_in_seconds"] = round(max(0.0, self.settings["open_seconds"] - (time.monotonic() - self.opened_at)), 1)
+        return stats
+
+
+class CircuitBreakers:
+    """One breaker per provider, created on first use."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return CIRCUIT_BREAKER_SETTINGS["enabled"]
+
+    def for_model(self, model_name: str) -> CircuitBreaker:
+        provider = provider_for_model(model_name)
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(provider)
+        return self._breakers[provider]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "providers": {provider: breaker.stats() for provider, breaker in sorted(self._breakers.items())}
+        }
+
+
+_breakers: Optional[CircuitBreakers] = None
+
+
+def get_circuit_breakers() -> CircuitBreakers:
+    global _breakers
+    if _breakers is None:
+        _breakers = CircuitBreakers()
+    return _breakers
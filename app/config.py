@@ -29,6 +29,217 @@ AGENT_TEMPERATURES = {
     "consistency_checker": 0.05  # Claude 3.7 Haiku temperature
 }
 
+# Pre-flight prompt budgets (estimated input tokens); calls over budget are refused before
+# reaching the provider. Agents not listed use PROMPT_BUDGET_DEFAULT
+AGENT_PROMPT_BUDGETS = {
+    "tape_study": 16000,
+    "stats_trends": 16000,
+    "news_weighins": 16000,
+    "style_matchup": 16000,
+    "market_odds": 16000,
+    "judge": 64000,
+    "risk_scorer": 16000,
+    "consistency_checker": 16000
+}
+PROMPT_BUDGET_DEFAULT = int(os.getenv("PROMPT_BUDGET_DEFAULT", "32000"))
+
+# Hedged requests for latency-critical agents: if the primary model has not answered
+# by this percentile of its recent latency, the same prompt also goes to the next
+# model in "models"; the first answer wins and the other call is cancelled
+AGENT_HEDGING = {
+    "judge": {"models": ["claude-3-7-sonnet-20250219"], "percentile": 95},
+    "market_odds": {"models": ["claude-3-5-haiku-20241022"], "percentile": 90}
+}
+
+HEDGE_SETTINGS = {
+    "enabled": os.getenv("HEDGING_ENABLED", "false").lower() == "true",
+    "window": int(os.getenv("HEDGE_LATENCY_WINDOW", "200")),       # latency samples kept per model
+    "min_samples": int(os.getenv("HEDGE_MIN_SAMPLES", "20")),      # before the percentile is trusted
+    "initial_delay": float(os.getenv("HEDGE_INITIAL_DELAY", "30")),  # used until then
+    "min_delay": float(os.getenv("HEDGE_MIN_DELAY", "1"))
+}
+
+# Ordered fallback models per agent, tried in turn when the model before fails or its
+# provider's circuit breaker is open. Agents not listed have no fallback
+AGENT_FALLBACKS = {
+    "tape_study": ["gpt-5"],
+    "stats_trends": ["claude-3-7-sonnet-20250219"],
+    "news_weighins": ["claude-3-7-sonnet-20250219"],
+    "style_matchup": ["gpt-5"],
+    "market_odds": ["claude-3-5-haiku-20241022"],
+    "judge": ["claude-3-7-sonnet-20250219"],
+    "risk_scorer": ["claude-3-5-haiku-20241022"],
+    "consistency_checker": ["gpt-5-mini"]
+}
+FALLBACKS_ENABLED = os.getenv("FALLBACKS_ENABLED", "true").lower() == "true"
+
+# Per-provider circuit breakers: open on a high error rate or too many slow calls,
+# skip the provider while open, then let a probe through to test recovery
+CIRCUIT_BREAKER_SETTINGS = {
+    "enabled": os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true",
+    "window": int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20")),          # recent calls considered
+    "min_calls": int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5")),     # before the breaker may open
+    "error_rate": float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", "0.5")),
+    "slow_call_seconds": float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "120")),
+    "slow_rate": float(os.getenv("CIRCUIT_BREAKER_SLOW_RATE", "0.5")),
+    "open_seconds": float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30")),  # before probing again
+    "half_open_probes": int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_PROBES", "1"))
+}
+
+# Provider prompt caching for the large static system prompts. Anthropic needs an
+# explicit cache_control breakpoint; OpenAI and Gemini cache a stable prefix automatically
+PROMPT_CACHE_SETTINGS = {
+    "enabled": os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+}
+
+# Approximate list prices in USD per 1M (input, output) tokens, for cost reporting
+MODEL_PRICING = {
+    "gpt-5": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-4o": (2.5, 10.0),
+    "claude-3-7-sonnet-20250219": (3.0, 15.0),
+    "claude-3-5-haiku-20241022": (0.8, 4.0)
+}
+
+# Global cap on concurrent agent calls, shared fairly by every card and request
+AGENT_CONCURRENCY_LIMIT = int(os.getenv("AGENT_CONCURRENCY_LIMIT", "32"))
+
+# Shared provider HTTP connection pools (kept alive across requests)
+HTTP_POOL_SETTINGS = {
+    "max_connections": int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20")),
+    "keepalive_expiry": float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "120")),
+    "timeout": float(os.getenv("HTTP_POOL_TIMEOUT", "600")),
+    "connect_timeout": float(os.getenv("HTTP_POOL_CONNECT_TIMEOUT", "10"))
+}
+
+# Serper web search client
+SERPER_SETTINGS = {
+    "base_url": os.getenv("SERPER_BASE_URL", "https://google.serper.dev"),
+    "num_results": int(os.getenv("SERPER_NUM_RESULTS", "5")),
+    "request_timeout": float(os.getenv("SERPER_REQUEST_TIMEOUT", "10")),  # per HTTP call
+    "connect_timeout": float(os.getenv("SERPER_CONNECT_TIMEOUT", "3")),
+    "total_timeout": float(os.getenv("SERPER_TOTAL_TIMEOUT", "20")),  # including queueing for a slot
+    "max_concurrency": int(os.getenv("SERPER_MAX_CONCURRENCY", "8")),
+    "max_connections": int(os.getenv("SERPER_MAX_CONNECTIONS", "16"))
+}
+
+# Serper result cache: TTL (seconds) picked by the first matching keyword group
+SERPER_CACHE_SETTINGS = {
+    "enabled": os.getenv("SERPER_CACHE_ENABLED", "true").lower() == "true",
+    "max_entries": int(os.getenv("SERPER_CACHE_MAX_ENTRIES", "2048")),
+    "default_ttl": float(os.getenv("SERPER_CACHE_DEFAULT_TTL", "21600")),  # 6h
+    "ttl_rules": [
+        # News goes stale quickly during fight week
+        (("injury", "injured", "news", "weigh", "weight cut", "odds", "line", "betting",
+          "camp", "withdraw", "replacement", "latest", "today"), 900),
+        # Records and career history barely move
+        (("record", "history", "career", "stats", "statistics", "reach", "height"), 86400)
+    ]
+}
+
+# Whole-card analysis result cache ("memory" or "sqlite")
+RESULT_CACHE_SETTINGS = {
+    "enabled": os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true",
+    "backend": os.getenv("RESULT_CACHE_BACKEND", "memory"),
+    "path": os.getenv("RESULT_CACHE_PATH", "cache/results.db"),
+    "ttl": float(os.getenv("RESULT_CACHE_TTL", "43200")),  # 12h
+    "max_entries": int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256")),
+    "disk_max_entries": int(os.getenv("RESULT_CACHE_DISK_MAX_ENTRIES", "10000"))
+}
+
+# Per-stage output memoization, so changing one stage's model reuses the others
+STAGE_CACHE_SETTINGS = {
+    "enabled": os.getenv("STAGE_CACHE_ENABLED", "true").lower() == "true",
+    "backend": os.getenv("STAGE_CACHE_BACKEND", "memory"),
+    "path": os.getenv("STAGE_CACHE_PATH", "cache/stages.db"),
+    "ttl": float(os.getenv("STAGE_CACHE_TTL", "43200")),  # 12h
+    # Analysis outputs built from live searches go stale as fast as the news they quote
+    "search_ttl": float(os.getenv("STAGE_CACHE_SEARCH_TTL", "900")),
+    "max_entries": int(os.getenv("STAGE_CACHE_MAX_ENTRIES", "2048")),
+    "disk_max_entries": int(os.getenv("STAGE_CACHE_DISK_MAX_ENTRIES", "50000"))
+}
+
+# How a request deadline (Card.deadline_seconds / X-Deadline-Seconds) is split across stages
+DEADLINE_STAGE_SHARES = {
+    "analysis": 0.6,  # five analysis agents, run in parallel
+    "judge": 0.3,
+    "post": 0.1       # risk scorer + consistency checker
+}
+
+# Per-fight judging (Card.judge_per_fight): one judge call per fight, run in parallel
+JUDGE_SETTINGS = {
+    "per_fight_concurrency": int(os.getenv("JUDGE_PER_FIGHT_CONCURRENCY", "4")),  # per card
+    "fight_retries": int(os.getenv("JUDGE_FIGHT_RETRIES", "2")),
+    "retry_backoff": float(os.getenv("JUDGE_RETRY_BACKOFF", "1"))  # seconds, doubled each retry
+}
+
+# Repair of invalid structured output (judge and post agents): only the broken
+# entries are re-requested, up to max_attempts follow-ups with exponential backoff
+REPAIR_SETTINGS = {
+    "max_attempts": int(os.getenv("REPAIR_MAX_ATTEMPTS", "2")),
+    "backoff": float(os.getenv("REPAIR_BACKOFF", "0.5"))  # seconds before the second attempt, doubled after
+}
+
+# Local rules + calibration engine used instead of the risk scorer and consistency
+# checker LLM passes when a card asks for post_processing="local" (and as their fallback)
+LOCAL_POSTPROCESS_SETTINGS = {
+    # one JSON object per line: {"confidence": 72, "correct": true}
+    "history_path": os.getenv("CALIBRATION_HISTORY_PATH", "data/pick_history.jsonl"),
+    "method": os.getenv("CALIBRATION_METHOD", "isotonic"),  # "isotonic" or "platt"
+    "min_samples": int(os.getenv("CALIBRATION_MIN_SAMPLES", "50")),
+    "overconfidence_threshold": 90,
+    "flag_penalty": 5,    # confidence points per risk flag beyond the first
+    "max_penalty": 15,
+    "min_confidence": 50  # a pick is never below a coin flip
+}
+
+# Rule-based risk flags: added when any keyword appears in the path to victory or props
+RISK_RULES = [
+    (("decision", "scorecard", "points"), "decision outcome exposed to judging variance"),
+    (("short notice", "short-notice", "replacement"), "short-notice change disrupts camp preparation"),
+    (("weight cut", "missed weight", "weight miss"), "weight cut concerns"),
+    (("injur", "surgery", "knee", "shoulder"), "injury concerns reported"),
+    (("layoff", "inactive", "ring rust", "time off"), "long layoff may cause ring rust"),
+    (("knockout", "tko", "power", "finish"), "single-shot finishing power creates volatility"),
+    (("submission", "choke", "scramble"), "grappling exchanges can swing abruptly"),
+    (("debut", "first ufc", "unknown"), "limited top-level data on one fighter")
+]
+
+# Per-request span traces (?profile=true or X-Profile: 1, or every request with PROFILE_REQUESTS=true)
+PROFILE_SETTINGS = {
+    "always": os.getenv("PROFILE_REQUESTS", "false").lower() == "true",
+    "dir": os.getenv("PROFILE_DIR", "cache/traces")
+}
+
+# Record/replay of provider and Serper traffic to a JSONL cassette
+CASSETTE_SETTINGS = {
+    "mode": os.getenv("CASSETTE_MODE", "off").lower(),  # "off", "record" or "replay"
+    "path": os.getenv("CASSETTE_PATH", "cache/cassette.jsonl"),
+    "timing": os.getenv("CASSETTE_TIMING", "original").lower(),  # replay delays: "original", "compressed" or "none"
+    "time_scale": float(os.getenv("CASSETTE_TIME_SCALE", "0.1")),  # factor applied to recorded delays when compressed
+    "on_miss": os.getenv("CASSETTE_ON_MISS", "error").lower()  # "error" or "passthrough" to the live provider
+}
+
+# Background job queue (POST /jobs)
+JOB_SETTINGS = {
+    "db_path": os.getenv("JOB_DB_PATH", "cache/jobs.db"),
+    "workers": int(os.getenv("JOB_WORKERS", "2")),
+    "poll_interval": float(os.getenv("JOB_POLL_INTERVAL", "2"))
+}
+
+# Rate limits shared by all agents: requests and tokens per minute, per provider
+PROVIDER_RATE_LIMITS = {
+    "openai": {"rpm": int(os.getenv("OPENAI_RPM", "500")), "tpm": int(os.getenv("OPENAI_TPM", "500000"))},
+    "anthropic": {"rpm": int(os.getenv("ANTHROPIC_RPM", "50")), "tpm": int(os.getenv("ANTHROPIC_TPM", "40000"))},
+    "google": {"rpm": int(os.getenv("GOOGLE_RPM", "150")), "tpm": int(os.getenv("GOOGLE_TPM", "1000000"))}
+}
+
+# Optional tighter per-model limits, checked before the provider's
+MODEL_RATE_LIMITS = {
+    # "gpt-5": {"rpm": 100, "tpm": 200000},
+}
+
 # API Keys
 API_KEYS = {
     "openai": os.getenv("OPENAI_API_KEY"),
@@ -45,5 +256,18 @@ def get_model_for_agent(agent_type: str) -> str:
 def get_temperature_for_agent(agent_type: str) -> float:
     return AGENT_TEMPERATURES.get(agent_type, 0.1)  # default temperature
 
+def get_prompt_budget(agent_type: str) -> int:
+    return AGENT_PROMPT_BUDGETS.get(agent_type, PROMPT_BUDGET_DEFAULT)
+
+def get_hedge_models(agent_type: str) -> list:
+    if not HEDGE_SETTINGS["enabled"]:
+        return []
+    return AGENT_HEDGING.get(agent_type, {}).get("models", [])
+
+def get_fallback_models(agent_type: str) -> list:
+    if not FALLBACKS_ENABLED:
+        return []
+    return AGENT_FALLBACKS.get(agent_type, [])
+
 def get_api_key(provider: str) -> str:
     return API_KEYS.get(provider)
@@ -0,0 +1,31 @@
+import time
+from typing import Dict, Optional
+from app.config import DEADLINE_STAGE_SHARES
+
+STAGE_ORDER = ["analysis", "judge", "post"]
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class DeadlineBudget:
+    """Splits a request deadline across the pipeline stages.
+
+    Each stage is allotted its share of whatever time is left, relative to the
+    shares of the stages still to come, so time a stage does not use rolls
+    forward to the later stages.
+    """
+
+    def __init__(self, total_seconds: float, shares: Optional[Dict[str, float]] = None):
+        self.total = total_seconds
+        self.shares = shares or DEADLINE_STAGE_SHARES
+        self.started = time.monotonic()
+
+    def remaining(self) -> float:
+        return max(0.0, self.total - (time.monotonic() - self.started))
+
+    def allot(self, stage: str) -> float:
+        upcoming = STAGE_ORDER[STAGE_ORDER.index(stage):]
+        weight = sum(self.shares[s] for s in upcoming)
+        return self.remaining() * (self.shares[stage] / weight) if weight else self.remaining()
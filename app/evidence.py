@@ -0,0 +1,63 @@
+import json
+from typing import Dict, List, Optional
+from loguru import logger
+from pydantic import ValidationError
+from app.card_format import format_fight
+from app.models import AgentEvidence, Fight, FightEvidence
+
+EVIDENCE_INSTRUCTIONS = """
+Return structured evidence only, one entry per fight_id on the card:
+- lean: the fighter your analysis favors (exact name as given) or "even"
+- lean_strength: 0-100, how strongly the evidence favors that fighter
+- key_factors: at most 5 short phrases, the decisive factors
+- signals: numeric signals keyed by short snake_case names (e.g. sig_strike_diff, reach_advantage_in, implied_prob)
+- citations: URLs or named sources you relied on, if any
+"""
+
+
+def parse_evidence(output: str) -> Optional[AgentEvidence]:
+    try:
+        return AgentEvidence.model_validate_json(output)
+    except (ValidationError, ValueError) as e:
+        logger.warning(f"Unparseable structured evidence: {e}")
+        return None
+
+
+def merge_evidence(per_fight: Dict[str, str]) -> str:
+    """Combine per-fight (sharded) evidence outputs into one AgentEvidence JSON string."""
+    fights: List[FightEvidence] = []
+    for output in per_fight.values():
+        evidence = parse_evidence(output)
+        if evidence is not None:
+            fights.extend(evidence.fights)
+    return AgentEvidence(fights=fights).model_dump_json()
+
+
+def format_fight_evidence(agent_type: str, evidence: FightEvidence) -> str:
+    parts = [f"{agent_type}: lean {evidence.lean} ({evidence.lean_strength})"]
+    if evidence.key_factors:
+        parts.append("factors: " + "; ".join(evidence.key_factors))
+    if evidence.signals:
+        parts.append("signals: " + ", ".join(f"{k}={v:g}" for k, v in sorted(evidence.signals.items())))
+    if evidence.citations:
+        parts.append("sources: " + ", ".join(evidence.citations))
+    return " | ".join(parts)
+
+
+def evidence_for_fight(evidence: Dict[str, AgentEvidence], fight_id: str) -> List[str]:
+    """Only the lines for one fight, one per agent that covered it."""
+    return [
+        format_fight_evidence(agent_type, fight)
+        for agent_type, agent_evidence in evidence.items()
+        for fight in agent_evidence.fights if fight.fight_id == fight_id
+    ]
+
+
+def format_evidence(evidence: Dict[str, AgentEvidence], fights: List[Fight]) -> str:
+    """Evidence grouped by fight under its card line, so the judge reads each bout's signals side by side
+    and picks from the fighters' exact names."""
+    blocks = []
+    for fight in fights:
+        lines = evidence_for_fight(evidence, fight.fight_id) or ["(no evidence)"]
+        blocks.append(format_fight(fight) + "\n" + "\n".join(lines))
+    return "\n\n".join(blocks)
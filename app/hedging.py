@@ -0,0 +1,137 @@
+import asyncio
+import math
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from loguru import logger
+from app.config import AGENT_HEDGING, HEDGE_SETTINGS, MODEL_PRICING, get_hedge_models
+from app.tokens import usage_from_messages
+
+
+def call_cost(model_name: str, input_tokens: int, output_tokens: int) -> float:
+    """Approximate USD cost of one call; unknown models cost 0."""
+    input_price, output_price = MODEL_PRICING.get(model_name, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per model."""
+
+    def __init__(self, window: int):
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def observe(self, model_name: str, seconds: float):
+        self._samples[model_name].append(seconds)
+
+    def percentile(self, model_name: str, pct: float, min_samples: int) -> Optional[float]:
+        samples = sorted(self._samples.get(model_name, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+
+class Hedger:
+    """Races a primary model against backups for the agents listed in AGENT_HEDGING.
+
+    The primary call starts immediately. If it has not answered within the
+    configured percentile of that model's recent latency (or fails outright),
+    the same prompt is sent to the next model. The first successful answer
+    wins and every other call still in flight is cancelled. Tokens spent on
+    discarded calls are tracked per agent so the extra cost stays visible.
+    """
+
+    def __init__(self):
+        self.latencies = LatencyTracker(HEDGE_SETTINGS["window"])
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "calls": 0, "hedged": 0, "hedge_wins": 0,
+            "wasted_tokens": 0, "wasted_cost_usd": 0.0, "hedge_cost_usd": 0.0, "last_delay_seconds": 0.0
+        })
+
+    def hedge_delay(self, agent_type: str, model_name: str) -> float:
+        pct = AGENT_HEDGING.get(agent_type, {}).get("percentile", 95)
+        delay = self.latencies.percentile(model_name, pct, HEDGE_SETTINGS["min_samples"])
+        if delay is None:
+            delay = HEDGE_SETTINGS["initial_delay"]
+        return max(HEDGE_SETTINGS["min_delay"], delay)
+
+    async def run(self, agent_type: str, model_name: str, estimated_tokens: int,
+                  call: Callable[[str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run ``call(model)`` for the primary model, hedging to backups when configured."""
+        models = [model_name] + [m for m in get_hedge_models(agent_type) if m != model_name]
+        if len(models) == 1:
+            return await self._timed(model_name, call)
+
+        stats = self._stats[agent_type]
+        stats["calls"] += 1
+        delay = stats["last_delay_seconds"] = self.hedge_delay(agent_type, model_name)
+        pending: Dict[asyncio.Task, str] = {}
+        backups = iter(models[1:])
+        last_error: Optional[BaseException] = None
+
+        def launch(model: str):
+            pending[asyncio.ensure_future(self._timed(model, call))] = model
+
+        launch(model_name)
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"{agent_type} call to {model} failed while hedging: {last_error}")
+                        continue
+                    result = task.result()
+                    if model != model_name:
+                        stats["hedge_wins"] += 1
+                        stats["hedge_cost_usd"] += self._cost(model, result)
+                    self._charge_losers(stats, pending, estimated_tokens)
+                    return result
+                # nothing usable yet: either the delay elapsed or a call failed
+                backup = next(backups, None)
+                if backup is not None:
+                    logger.info(f"Hedging {agent_type}: {model_name} slow or failing, also trying {backup}")
+                    stats["hedged"] += 1
+                    launch(backup)
+            raise last_error or RuntimeError(f"All hedged calls failed for {agent_type}")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed(self, model_name: str, call: Callable[[str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = await call(model_name)
+        self.latencies.observe(model_name, time.monotonic() - started)
+        return result
+
+    @staticmethod
+    def _cost(model_name: str, result: Dict[str, Any]) -> float:
+        usage = usage_from_messages(result.get("messages", []))
+        return call_cost(model_name, usage["input_tokens"], usage["output_tokens"])
+
+    @staticmethod
+    def _charge_losers(stats: Dict[str, float], losers: Dict[asyncio.Task, str], estimated_tokens: int):
+        # A cancelled call has usually been billed for its prompt already
+        for model in losers.values():
+            stats["wasted_tokens"] += estimated_tokens
+            stats["wasted_cost_usd"] += call_cost(model, estimated_tokens, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": HEDGE_SETTINGS["enabled"],
+            "agents": {
+                agent_type: {k: round(v, 6) if isinstance(v, float) else v for k, v in stats.items()}
+                for agent_type, stats in sorted(self._stats.items())
+            }
+        }
+
+
+_hedger: Optional[Hedger] = None
+
+
+def get_hedger() -> Hedger:
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger()
+    return _hedger
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from app.config import JOB_SETTINGS
+from app.models import Card, CardAnalysisResponse, JobInfo
+from app.pipeline import ANALYSIS_AGENT_TYPES, run_pipeline
+from app.stage_cache import STAGES
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+TERMINAL_STATUSES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobStore:
+    """SQLite-backed job queue; queued and running jobs survive a restart."""
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, card TEXT NOT NULL, progress TEXT NOT NULL, "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_checkpoints ("
+            "job_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (job_id, key))"
+        )
+
+    def create(self, card: Card) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        progress = {stage: "pending" for stage in STAGES}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, card, progress, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, card.model_dump_json(), json.dumps(progress), now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def claim_next(self) -> Optional[sqlite3.Row]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, time.time(), row["id"])
+            )
+            return row
+
+    def update(self, job_id: str, only_if: Optional[str] = None, **fields) -> bool:
+        """Update a job, only while it is in status ``only_if`` when given; returns whether it changed."""
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        query, params = f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id]
+        if only_if is not None:
+            query += " AND status = ?"
+            params.append(only_if)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount > 0
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left running by a previous process back in the queue."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?", (QUEUED, time.time(), RUNNING)
+            ).rowcount
+
+    def checkpoints(self, job_id: str) -> "JobCheckpoints":
+        return JobCheckpoints(self, job_id)
+
+    def drop_checkpoints(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        self._conn.close()
+
+
+class JobCheckpoints:
+    """Per-job stage outputs, persisted so a resumed job skips completed stages."""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self._store = store
+        self.job_id = job_id
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._store._lock:
+            row = self._store._conn.execute(
+                "SELECT value FROM job_checkpoints WHERE job_id = ? AND key = ?", (self.job_id, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._store._lock:
+            self._store._conn.execute(
+                "INSERT OR REPLACE INTO job_checkpoints (job_id, key, value) VALUES (?, ?, ?)",
+                (self.job_id, key, json.dumps(value))
+            )
+
+
+def job_info(row: sqlite3.Row) -> JobInfo:
+    result = CardAnalysisResponse(**json.loads(row["result"])) if row["result"] else None
+    return JobInfo(
+        job_id=row["id"],
+        status=row["status"],
+        progress=json.loads(row["progress"]),
+        result=result,
+        dropped_agents=result.dropped_agents if result else None,
+        failed_agents=result.failed_agents if result else None,
+        error=row["error"],
+        attempts=row["attempts"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"]
+    )
+
+
+class JobManager:
+    """Bounded pool of asyncio workers draining the SQLite job queue."""
+
+    def __init__(self, path: Optional[str] = None, workers: Optional[int] = None):
+        self.store = JobStore(path or JOB_SETTINGS["db_path"])
+        self.worker_count = workers or JOB_SETTINGS["workers"]
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        resumed = self.store.requeue_interrupted()
+        if resumed:
+            logger.info(f"Resuming {resumed} interrupted jobs")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        self._wakeup.set()
+
+    async def stop(self):
+        self._stopping = True
+        # Running jobs stay marked running in the store and are requeued on the next start
+        for task in [*self._running.values(), *self._workers]:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.store.close()
+
+    def submit(self, card: Card) -> str:
+        job_id = self.store.create(card)
+        logger.info(f"Queued job {job_id} for {len(card.fights)} fights")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        row = self.store.get(job_id)
+        return job_info(row) if row else None
+
+    def cancel(self, job_id: str) -> Optional[JobInfo]:
+        row = self.store.get(job_id)
+        if row is None or row["status"] in TERMINAL_STATUSES:
+            return job_info(row) if row else None
+        self.store.update(job_id, status=CANCELLED)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        self.store.drop_checkpoints(job_id)
+        logger.info(f"Cancelled job {job_id}")
+        return self.get(job_id)
+
+    async def _worker(self, index: int):
+        while True:
+            row = self.store.claim_next()
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_SETTINGS["poll_interval"])
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run(row))
+            self._running[row["id"]] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if self._stopping:
+                    raise
+                # the job was cancelled through cancel(); keep serving the queue
+            finally:
+                self._running.pop(row["id"], None)
+
+    async def _run(self, row: sqlite3.Row):
+        job_id = row["id"]
+        card = Card.model_validate_json(row["card"])
+        progress = json.loads(row["progress"])
+        shard_total = len(card.fights) if card.shard_by_fight else 1
+        completed = {agent_type: 0 for agent_type in ANALYSIS_AGENT_TYPES}
+        logger.info(f"Running job {job_id} (attempt {row['attempts'] + 1})")
+
+        async def on_event(event: Dict[str, Any]):
+            if event["event"] == "agent_completed":
+                agent_type = event["agent"]
+                completed[agent_type] += 1
+                done = completed[agent_type] >= shard_total
+                progress[agent_type] = "completed" if done else f"{completed[agent_type]}/{shard_total}"
+            elif event["event"] == "stage_completed" and event["stage"] in progress:
+                progress[event["stage"]] = "completed"
+            else:
+                return
+            self.store.update(job_id, progress=json.dumps(progress))
+
+        try:
+            result = await run_pipeline(card, on_event=on_event, checkpoints=self.store.checkpoints(job_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, only_if=RUNNING, status=FAILED, error=str(e))
+            return
+
+        response = CardAnalysisResponse(
+            analyses=result.analyses,
+            recomputed_stages=result.recomputed_stages,
+            dropped_agents=result.dropped_agents or None,
+            failed_agents=result.failed_agents or None
+        )
+        # a cancel that landed while the pipeline was finishing wins over the result
+        if not self.store.update(job_id, only_if=RUNNING, status=SUCCEEDED, result=response.model_dump_json()):
+            logger.info(f"Job {job_id} was cancelled before it could complete; result discarded")
+            return
+        self.store.drop_checkpoints(job_id)
+        logger.info(f"Job {job_id} succeeded")
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
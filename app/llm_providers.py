@@ -1,18 +1,83 @@
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config import get_api_key
+from functools import lru_cache
+from typing import Dict, Tuple
+import httpx
+from app.cassette import CassetteChatModel, get_cassette
+from app.config import get_api_key, HTTP_POOL_SETTINGS
+
+# One chat model per (model, temperature); each keeps its own client alive
+_LLM_CACHE: Dict[Tuple[str, float], object] = {}
+
+# Shared HTTP/2 connection pools per provider
+_HTTP_CLIENTS: Dict[str, httpx.Client] = {}
+_ASYNC_HTTP_CLIENTS: Dict[str, httpx.AsyncClient] = {}
+
+def _pool_kwargs() -> dict:
+    return {
+        "http2": True,
+        "limits": httpx.Limits(
+            max_connections=HTTP_POOL_SETTINGS["max_connections"],
+            max_keepalive_connections=HTTP_POOL_SETTINGS["max_keepalive_connections"],
+            keepalive_expiry=HTTP_POOL_SETTINGS["keepalive_expiry"],
+        ),
+        "timeout": httpx.Timeout(HTTP_POOL_SETTINGS["timeout"], connect=HTTP_POOL_SETTINGS["connect_timeout"]),
+    }
+
+def get_http_client(provider: str) -> httpx.Client:
+    if provider not in _HTTP_CLIENTS:
+        _HTTP_CLIENTS[provider] = httpx.Client(**_pool_kwargs())
+    return _HTTP_CLIENTS[provider]
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    if provider not in _ASYNC_HTTP_CLIENTS:
+        _ASYNC_HTTP_CLIENTS[provider] = httpx.AsyncClient(**_pool_kwargs())
+    return _ASYNC_HTTP_CLIENTS[provider]
+
+async def close_http_clients():
+    for client in _ASYNC_HTTP_CLIENTS.values():
+        await client.aclose()
+    for client in _HTTP_CLIENTS.values():
+        client.close()
+    _ASYNC_HTTP_CLIENTS.clear()
+    _HTTP_CLIENTS.clear()
+    _LLM_CACHE.clear()
+
+def provider_for_model(model_name: str) -> str:
+    if model_name.startswith("claude"):
+        return "anthropic"
+    elif model_name.startswith("gemini"):
+        return "google"
+    # gpt-* and the GPT-4o default
+    return "openai"
 
 def get_llm(model_name: str, temperature: float = 0.1):
+    key = (model_name, temperature)
+    if key not in _LLM_CACHE:
+        if get_cassette().mode != "off":
+            # built lazily (and once), so replaying never needs the provider's key
+            _LLM_CACHE[key] = CassetteChatModel(
+                model_name=model_name, temperature=temperature,
+                build=lru_cache(maxsize=None)(lambda: _build_llm(model_name, temperature))
+            )
+        else:
+            _LLM_CACHE[key] = _build_llm(model_name, temperature)
+    return _LLM_CACHE[key]
+
+# Provider packages are imported on first use, so a deployment only loads the ones its models need
+def _build_llm(model_name: str, temperature: float):
     if model_name.startswith("gpt"):
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model=model_name,
             api_key=get_api_key("openai"),
             temperature=temperature,
             reasoning={ "effort": "medium" },
+            http_client=get_http_client("openai"),
+            http_async_client=get_async_http_client("openai"),
             verbose=True
         )
     elif model_name.startswith("claude"):
+        # langchain-anthropic owns its httpx client; caching the model keeps it warm
+        from langchain_anthropic import ChatAnthropic
         return ChatAnthropic(
             model=model_name,
             api_key=get_api_key("anthropic"),
@@ -20,6 +85,7 @@ def get_llm(model_name: str, temperature: float = 0.1):
             max_tokens=4096  # Ensure adequate response length
         )
     elif model_name.startswith("gemini"):
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(
             model=model_name,
             api_key=get_api_key("google"),
@@ -27,8 +93,11 @@ def get_llm(model_name: str, temperature: float = 0.1):
         )
     else:
         # Default to GPT-4o
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model="gpt-4o",
             api_key=get_api_key("openai"),
-            temperature=temperature
+            temperature=temperature,
+            http_client=get_http_client("openai"),
+            http_async_client=get_async_http_client("openai")
         )
@@ -1,51 +1,337 @@
-from fastapi import FastAPI, HTTPException
-from app.models import Card, CardAnalysis
-from app.agents import (
-    tape_study_agent, stats_trends_agent, news_weighins_agent,
-    style_matchup_agent, market_odds_agent, judge_agent,
-    risk_scorer_agent, consistency_checker_agent
-)
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.routing import Match
+from app.models import Card, CardAnalysis, CardAnalysisResponse, CardBatch, JobInfo
+from app.agent_registry import registry
+from app.agents import prompt_budget_report, warm_up_agents
+from app.cassette import get_cassette
+from app.circuit_breaker import get_circuit_breakers
+from app.config import PROFILE_SETTINGS, get_api_key
+from app.deadline import DeadlineExceeded
+from app.hedging import get_hedger
+from app.jobs import get_job_manager
+from app.llm_providers import close_http_clients
+from app.metrics import REQUESTS_IN_FLIGHT, init_metrics, record_error, render
+from app.pipeline import run_pipeline
+from app.postprocess import get_post_processor
+from app.rate_limit import get_rate_limiter
+from app.result_cache import cache_status, card_cache_key, get_result_cache, ttl_for_card
+from app.scheduler import get_scheduler
+from app.serper import close_serper_client, get_serper_client
+from app.stage_cache import get_stage_cache
+from app.streaming import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, STREAM_HEADERS, stream_events
+from app.tokens import get_usage_tracker
+from app.tracing import RequestTrace, request_trace, trace_file, trace_span
+from contextlib import asynccontextmanager
 import asyncio
 from loguru import logger
 
-app = FastAPI(title="UFC Card Analysis API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the default agent set once so requests only pay for inference
+    init_metrics()
+    built = warm_up_agents(include_search=bool(get_api_key("serper")))
+    logger.info(f"Pre-built {built} agents")
+    await get_job_manager().start()
+    yield
+    await get_job_manager().stop()
+    await close_serper_client()
+    await close_http_clients()
+    # compiled agents hold chat models bound to the clients just closed; rebuild them on the next startup
+    registry.clear()
 
-@app.post("/analyze-card", response_model=CardAnalysis)
-async def analyze_card(card: Card):
+app = FastAPI(title="UFC Card Analysis API", version="1.0.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def track_in_flight(request: Request, call_next):
+    # label by the route template, not the raw path, to keep cardinality bounded
+    endpoint = next(
+        (route.path for route in app.router.routes if route.matches(request.scope)[0] == Match.FULL), "unmatched"
+    )
+    gauge = REQUESTS_IN_FLIGHT.labels(endpoint)
+    gauge.inc()
     try:
-        logger.info(f"Analyzing card with {len(card.fights)} fights")
+        response = await call_next(request)
+    except BaseException:
+        gauge.dec()
+        raise
+    # call_next returns once the headers are ready; a streamed body is still in flight until it is sent
+    body = response.body_iterator
+
+    async def tracked_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            gauge.dec()
 
-        # Extract model overrides from card
-        agent_models = card.agent_models
+    response.body_iterator = tracked_body()
+    return response
 
-        # # Run 5 main agents in parallel
-        tape_task = tape_study_agent(card, agent_models.tape_study if agent_models else None, card.use_serper)
-        stats_task = stats_trends_agent(card, agent_models.stats_trends if agent_models else None, card.use_serper)
-        news_task = news_weighins_agent(card, agent_models.news_weighins if agent_models else None, card.use_serper)
-        style_task = style_matchup_agent(card, agent_models.style_matchup if agent_models else None, card.use_serper)
-        market_task = market_odds_agent(card, agent_models.market_odds if agent_models else None, card.use_serper)
+def cache_directives(request: Request) -> set:
+    return {d.strip().lower() for d in request.headers.get("cache-control", "").split(",") if d.strip()}
+
+def with_deadline(card: Card, request: Request) -> Card:
+    """Apply an X-Deadline-Seconds header; the tighter of header and body wins."""
+    header = request.headers.get("x-deadline-seconds")
+    try:
+        seconds = float(header) if header else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Deadline-Seconds must be a number")
+    if seconds is None or seconds <= 0:
+        return card
+    if card.deadline_seconds is not None:
+        seconds = min(seconds, card.deadline_seconds)
+    return card.model_copy(update={"deadline_seconds": seconds})
 
-        tape, stats, news, style, market = await asyncio.gather(
-            tape_task, stats_task, news_task, style_task, market_task
-        )
+def flag(request: Request, name: str, header: str) -> bool:
+    value = request.query_params.get(name) or request.headers.get(header) or ""
+    return value.lower() in ("1", "true", "yes")
 
-        logger.info("Main agents completed")
+def traced_response(body: CardAnalysisResponse, response: Response, trace: RequestTrace,
+                    debug_timings: bool, profile: bool) -> Response:
+    """Serialize under the trace so the timing covers it, then attach Server-Timing (and the trace file)."""
+    with trace_span("serialize", "serialize"):
+        content = body.model_dump_json(exclude_none=True)
+    if debug_timings:
+        body.timings = trace.summary()
+        content = body.model_dump_json(exclude_none=True)
+    headers = dict(response.headers)
+    headers["Server-Timing"] = trace.server_timing()
+    if profile:
+        headers["X-Profile-Trace"] = trace.dump()
+    return Response(content=content, media_type="application/json", headers=headers)
 
-        # Judge agent
-        analyses = await judge_agent(card, tape, stats, news, style, market, agent_models.judge if agent_models else None)
-        logger.info("Judge completed")
-        # Post agents
-        analyses = await risk_scorer_agent(analyses, agent_models.risk_scorer if agent_models else None)
-        analyses = await consistency_checker_agent(analyses, agent_models.consistency_checker if agent_models else None)
+@app.post("/analyze-card", response_model=CardAnalysisResponse, response_model_exclude_none=True)
+async def analyze_card(card: Card, request: Request, response: Response):
+    """Analyze a card.
 
-        logger.info("Post agents completed")
+    ``?debug_timings=true`` (or ``X-Debug-Timings: 1``) adds a Server-Timing header
+    and a ``timings`` block; ``?profile=true`` (or ``X-Profile: 1``) also writes the
+    request's span tree as a trace file (name in ``X-Profile-Trace``, served by GET /traces/{name}).
+    """
+    card = with_deadline(card, request)
+    debug_timings = flag(request, "debug_timings", "x-debug-timings")
+    profile = flag(request, "profile", "x-profile") or PROFILE_SETTINGS["always"]
+    try:
+        with request_trace(debug_timings or profile) as trace:
+            logger.info(f"Analyzing card with {len(card.fights)} fights")
 
-        return CardAnalysis(analyses=analyses)
+            # Identical cards (same fights, models, temperatures and prompts) reuse the stored analysis
+            result_cache = get_result_cache()
+            directives = cache_directives(request)
+            cache_key = card_cache_key(card)
+            response.headers["X-Cache-Key"] = cache_key
+            cached = result_cache.get(cache_key) if "no-cache" not in directives else None
+            if cached is not None:
+                logger.info(f"Serving cached analysis {cache_key[:12]}")
+                response.headers["Cache-Status"] = cache_status(hit=True)
+                body = CardAnalysisResponse(**cached, recomputed_stages=[])
+            else:
+                result = await run_pipeline(card, refresh="no-cache" in directives)
+                stored = result.cacheable and "no-store" not in directives
+                if stored:
+                    with trace_span("cache_store", "serialize"):
+                        result_cache.set(cache_key, CardAnalysis(analyses=result.analyses).model_dump(), ttl_for_card(card))
+                response.headers["Cache-Status"] = cache_status(
+                    hit=False, stored=stored, detail="request" if "no-cache" in directives else None
+                )
+                body = CardAnalysisResponse(
+                    analyses=result.analyses,
+                    recomputed_stages=result.recomputed_stages,
+                    dropped_agents=result.dropped_agents or None,
+                    failed_agents=result.failed_agents or None
+                )
+            if trace is not None:
+                return traced_response(body, response, trace, debug_timings, profile)
+            return body
 
+    except DeadlineExceeded as e:
+        logger.warning(f"Deadline exceeded analyzing card: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
+        record_error("api", e)
         logger.error(f"Error analyzing card: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze-card/stream")
+async def analyze_card_stream(card: Card, request: Request):
+    """Stream pipeline progress as NDJSON (or SSE with Accept: text/event-stream).
+
+    Emits agent_completed, stage_completed and fight_judged events as they happen;
+    the final event is ``result`` carrying the CardAnalysis, or ``error``.
+    """
+    sse = SSE_MEDIA_TYPE in request.headers.get("accept", "")
+    card = with_deadline(card, request)
+    logger.info(f"Streaming analysis for card with {len(card.fights)} fights")
+
+    result_cache = get_result_cache()
+    directives = cache_directives(request)
+    cache_key = card_cache_key(card)
+    cached = result_cache.get(cache_key) if "no-cache" not in directives else None
+
+    async def produce(on_event):
+        if cached is not None:
+            return {"event": "result", "data": cached, "cached": True, "recomputed_stages": []}
+        result = await run_pipeline(card, on_event=on_event, refresh="no-cache" in directives)
+        data = CardAnalysis(analyses=result.analyses).model_dump()
+        # the headers are already sent, so whether the result was stored is reported here
+        stored = result.cacheable and "no-store" not in directives
+        if stored:
+            result_cache.set(cache_key, data, ttl_for_card(card))
+        return {"event": "result", "data": data, "cached": False, "stored": stored,
+                "recomputed_stages": result.recomputed_stages,
+                "dropped_agents": result.dropped_agents, "failed_agents": result.failed_agents}
+
+    return StreamingResponse(
+        stream_events(produce, sse=sse),
+        media_type=SSE_MEDIA_TYPE if sse else NDJSON_MEDIA_TYPE,
+        headers={**STREAM_HEADERS, "Cache-Status": cache_status(hit=cached is not None), "X-Cache-Key": cache_key}
+    )
+
+@app.post("/analyze-card/estimate")
+async def estimate_card(card: Card):
+    """Pre-flight prompt size per analysis agent against its budget, without calling any provider."""
+    return prompt_budget_report(card)
+
+@app.post("/analyze-cards")
+async def analyze_cards(batch: CardBatch, request: Request):
+    """Analyze many cards at once, streaming each card's result as soon as it completes.
+
+    All agent calls from every card go through the shared FairScheduler, so the
+    global concurrency limit is used fully and slots alternate between cards.
+    Emits ``card_completed`` (or ``card_failed``) per card, then ``batch_completed``.
+    """
+    sse = SSE_MEDIA_TYPE in request.headers.get("accept", "")
+    directives = cache_directives(request)
+    result_cache = get_result_cache()
+    logger.info(f"Analyzing batch of {len(batch.cards)} cards")
+
+    async def analyze_one(index: int, card: Card) -> dict:
+        cache_key = card_cache_key(card)
+        try:
+            cached = result_cache.get(cache_key) if "no-cache" not in directives else None
+            if cached is not None:
+                return {"event": "card_completed", "index": index, "cache_key": cache_key,
+                        "cached": True, "data": cached, "recomputed_stages": []}
+            result = await run_pipeline(with_deadline(card, request), refresh="no-cache" in directives)
+            data = CardAnalysis(analyses=result.analyses).model_dump()
+            if result.cacheable and "no-store" not in directives:
+                result_cache.set(cache_key, data, ttl_for_card(card))
+            return {"event": "card_completed", "index": index, "cache_key": cache_key,
+                    "cached": False, "data": data, "recomputed_stages": result.recomputed_stages,
+                    "dropped_agents": result.dropped_agents, "failed_agents": result.failed_agents}
+        except Exception as e:
+            record_error("api", e)
+            logger.error(f"Error analyzing card {index} in batch: {e}")
+            return {"event": "card_failed", "index": index, "cache_key": cache_key, "detail": str(e)}
+
+    async def produce(on_event):
+        tasks = [asyncio.create_task(analyze_one(i, card)) for i, card in enumerate(batch.cards)]
+        failed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                event = await finished
+                failed += event["event"] == "card_failed"
+                await on_event(event)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return {"event": "batch_completed", "cards": len(tasks), "failed": failed}
+
+    return StreamingResponse(
+        stream_events(produce, sse=sse),
+        media_type=SSE_MEDIA_TYPE if sse else NDJSON_MEDIA_TYPE,
+        headers=STREAM_HEADERS
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus exposition: agent/stage latency, tokens, cost, Serper calls, errors and in-flight gauges."""
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    return get_scheduler().stats()
+
+@app.get("/rate-limits")
+async def rate_limit_stats():
+    """Queue depth and wait time for each provider/model rate limiter."""
+    return get_rate_limiter().stats()
+
+@app.get("/usage")
+async def token_usage():
+    """Token usage per agent and model, with cached vs. uncached input tokens."""
+    return get_usage_tracker().stats()
+
+@app.get("/hedging/stats")
+async def hedging_stats():
+    """How often each hedged agent fired a backup call, which model won, and what the extra calls cost."""
+    return get_hedger().stats()
+
+@app.get("/circuit-breakers")
+async def circuit_breakers():
+    """State of each provider's circuit breaker, with its recent error and slow-call rates."""
+    return get_circuit_breakers().stats()
+
+@app.get("/cassette")
+async def cassette_stats():
+    """Record/replay mode, the cassette file, and how many exchanges were recorded, replayed or missed."""
+    return get_cassette().stats()
+
+@app.get("/traces/{name}")
+async def get_trace(name: str):
+    """A trace file written for a ``?profile=true`` request, by the name returned in X-Profile-Trace."""
+    path = trace_file(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return FileResponse(path, media_type="application/json")
+
+@app.get("/calibration")
+async def calibration():
+    """Fitted confidence calibration curve used by post_processing="local"."""
+    return get_post_processor().describe()
+
+@app.post("/jobs", response_model=JobInfo, status_code=202)
+async def submit_job(card: Card):
+    """Queue a card for background analysis; poll GET /jobs/{job_id} for progress and the result."""
+    manager = get_job_manager()
+    return manager.get(manager.submit(card))
+
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.delete("/jobs/{job_id}", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "serper": get_serper_client().stats(),
+        "results": get_result_cache().stats(),
+        "stages": get_stage_cache().stats()
+    }
+
+@app.delete("/cache/results/{cache_key}")
+async def invalidate_cached_result(cache_key: str):
+    if not get_result_cache().invalidate(cache_key):
+        raise HTTPException(status_code=404, detail="No cached analysis for this key")
+    return {"invalidated": cache_key}
+
+@app.delete("/cache/results")
+async def clear_cached_results():
+    get_result_cache().clear()
+    return {"cleared": True}
+
 @app.get("/")
 async def root():
     return {"message": "UFC Card Analysis API", "endpoint": "/analyze-card"}
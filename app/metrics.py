@@ -0,0 +1,69 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from app.config import AGENT_MODELS
+from app.hedging import call_cost
+
+# LLM calls range from about a second to several minutes
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+AGENT_LATENCY = Histogram(
+    "ufc_agent_latency_seconds", "Provider time per agent call, excluding rate-limit waits",
+    ["agent", "model"], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "ufc_stage_latency_seconds", "Wall time per pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+AGENT_TOKENS = Counter(
+    "ufc_agent_tokens", "Tokens per agent and model; kind is prompt, completion or cached (cached is part of prompt)",
+    ["agent", "model", "kind"]
+)
+AGENT_COST = Counter("ufc_agent_cost_usd", "Estimated spend from MODEL_PRICING", ["agent", "model"])
+SERPER_REQUESTS = Counter("ufc_serper_requests", "Serper searches by outcome (cache_hit, upstream, error)", ["outcome"])
+SERPER_LATENCY = Histogram(
+    "ufc_serper_latency_seconds", "Upstream Serper call time", buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20)
+)
+ERRORS = Counter("ufc_errors", "Errors by component and exception type", ["component", "type"])
+MODEL_FALLBACKS = Counter(
+    "ufc_model_fallbacks", "Calls moved to the next model in AGENT_FALLBACKS; reason is error or circuit_open",
+    ["agent", "from_model", "to_model", "reason"]
+)
+CIRCUIT_STATE = Gauge("ufc_circuit_state", "Provider circuit breaker state: 0 closed, 1 half-open, 2 open", ["provider"])
+REQUESTS_IN_FLIGHT = Gauge("ufc_requests_in_flight", "HTTP requests being handled", ["endpoint"])
+AGENT_CALLS_IN_FLIGHT = Gauge("ufc_agent_calls_in_flight", "Agent calls waiting on a provider", ["agent"])
+
+
+def init_metrics():
+    """Create the per-agent series up front so dashboards show every AGENT_MODELS agent from the start."""
+    for agent_type, model_name in AGENT_MODELS.items():
+        AGENT_LATENCY.labels(agent_type, model_name)
+        AGENT_COST.labels(agent_type, model_name)
+        AGENT_CALLS_IN_FLIGHT.labels(agent_type)
+        for kind in ("prompt", "completion", "cached"):
+            AGENT_TOKENS.labels(agent_type, model_name, kind)
+
+
+def record_agent_call(agent_type: str, model_name: str, seconds: float, usage: Dict[str, int]):
+    AGENT_LATENCY.labels(agent_type, model_name).observe(seconds)
+    AGENT_TOKENS.labels(agent_type, model_name, "prompt").inc(usage["input_tokens"])
+    AGENT_TOKENS.labels(agent_type, model_name, "completion").inc(usage["output_tokens"])
+    AGENT_TOKENS.labels(agent_type, model_name, "cached").inc(usage["cache_read_tokens"])
+    AGENT_COST.labels(agent_type, model_name).inc(call_cost(model_name, usage["input_tokens"], usage["output_tokens"]))
+
+
+def record_error(component: str, error: BaseException):
+    ERRORS.labels(component, type(error).__name__).inc()
+
+
+@contextmanager
+def stage_timer(stage: str):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.monotonic() - started)
+
+
+def render() -> Tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Any, List, Literal, Optional, Dict
 
 class AgentModels(BaseModel):
     """Model overrides for specific agents"""
@@ -35,6 +35,27 @@ class Card(BaseModel):
         default=None,
         description="Optional model overrides for specific agents. If not provided, defaults are used."
     )
+    shard_by_fight: bool = Field(
+        default=False,
+        description="Run each analysis agent once per fight instead of once per card. Bounds prompt size and isolates slow or failed bouts."
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Overall time budget for the request. Analysis agents that overrun their share are dropped and the judge proceeds without them."
+    )
+    structured_evidence: bool = Field(
+        default=False,
+        description="Have analysis agents return compact structured evidence per fight instead of free-text essays; the judge then reads only that evidence, grouped by fight."
+    )
+    judge_per_fight: bool = Field(
+        default=False,
+        description="Judge each fight in its own parallel call instead of the whole card at once; a fight that fails is retried on its own instead of failing the card."
+    )
+    post_processing: Literal["llm", "local"] = Field(
+        default="llm",
+        description="How risk flags and confidence are refined after judging: the risk scorer and consistency checker LLM passes, or the local rules and calibration engine (milliseconds, no model calls)."
+    )
 
     class Config:
         schema_extra = {
@@ -66,6 +87,12 @@ class Card(BaseModel):
             }
         }
 
+class CardBatch(BaseModel):
+    cards: List[Card] = Field(
+        min_length=1,
+        description="Cards to analyze together; all agent calls share one scheduler and concurrency limit."
+    )
+
 class FightAnalysis(BaseModel):
     fight_id: str
     pick: str
@@ -74,5 +101,51 @@ class FightAnalysis(BaseModel):
     risk_flags: List[str]
     props: List[str]
 
+class FightEvidence(BaseModel):
+    """One analysis agent's compact findings for one fight."""
+    fight_id: str
+    lean: str = Field(description="Favored fighter's name, or \"even\"")
+    lean_strength: int = Field(ge=0, le=100)
+    key_factors: List[str] = Field(default_factory=list, max_length=5)
+    signals: Dict[str, float] = Field(default_factory=dict)
+    citations: List[str] = Field(default_factory=list)
+
+class AgentEvidence(BaseModel):
+    fights: List[FightEvidence]
+
 class CardAnalysis(BaseModel):
     analyses: List[FightAnalysis]
+
+class CardAnalysisResponse(CardAnalysis):
+    """CardAnalysis plus run metadata returned by the API (never requested from the judge)."""
+    recomputed_stages: Optional[List[str]] = Field(
+        default=None,
+        description="Pipeline stages executed for this request; stages not listed were reused from memoized outputs."
+    )
+    dropped_agents: Optional[List[str]] = Field(
+        default=None,
+        description="Agents cancelled for overrunning their share of the deadline (agent, or agent:fight_id when sharded); the judge ran without them."
+    )
+    failed_agents: Optional[List[str]] = Field(
+        default=None,
+        description="Agents that errored (or judge:fight_id for fights the judge could not score); the result was not cached."
+    )
+    timings: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Per-request timing breakdown, only with debug_timings: wall time per stage and agent, queue and rate-limit wait, provider time and time to first token, serper_search calls, serialization."
+    )
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: str = Field(description="queued, running, succeeded, failed or cancelled")
+    progress: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Per-stage status: pending, completed, or done/total fights for sharded analysis agents"
+    )
+    result: Optional[CardAnalysisResponse] = None
+    dropped_agents: Optional[List[str]] = None
+    failed_agents: Optional[List[str]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float
+    updated_at: float
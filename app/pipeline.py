@@ -0,0 +1,421 @@
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from pydantic import BaseModel
+from app.agents import (
+    ANALYSIS_AGENTS, analyses_section, run_analysis_agent, judge_agent, judge_evidence_agent, judge_fight_agent,
+    risk_scorer_agent, consistency_checker_agent, is_failed_output, track_substitutions,
+    basic_risk_assessment, basic_consistency_check
+)
+from app.agent_registry import prompt_version
+from app.config import AGENT_MODELS, JUDGE_SETTINGS, STAGE_CACHE_SETTINGS
+from app.deadline import DeadlineBudget, DeadlineExceeded
+from app.evidence import EVIDENCE_INSTRUCTIONS, evidence_for_fight, format_evidence, merge_evidence, parse_evidence
+from app.metrics import stage_timer
+from app.models import Card, CardAnalysis, Fight, FightAnalysis
+from app.scheduler import get_scheduler, new_owner, scheduling_owner
+from app.stage_cache import StageTracker, get_stage_cache
+from app.tracing import trace_span
+from app.validation import fight_problems
+
+ANALYSIS_AGENT_TYPES = list(ANALYSIS_AGENTS)
+
+# Receives progress events such as {"event": "agent_completed", "agent": "tape_study"}
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PipelineResult(BaseModel):
+    analyses: List[FightAnalysis]
+    failed_agents: List[str] = []
+    dropped_agents: List[str] = []
+    recomputed_stages: List[str] = []
+    reused_stages: List[str] = []
+    substituted_models: List[str] = []
+
+    @property
+    def cacheable(self) -> bool:
+        """Only complete runs on the requested models are worth reusing.
+
+        Failures and deadline drops may be transient, and the cache key names the
+        requested models, not the fallback or hedge models that answered instead.
+        """
+        return bool(self.analyses) and not self.failed_agents and not self.dropped_agents and not self.substituted_models
+
+
+def model_override(card: Card, agent_type: str) -> Optional[str]:
+    return getattr(card.agent_models, agent_type) if card.agent_models else None
+
+
+def resolve_model(card: Card, agent_type: str) -> str:
+    return model_override(card, agent_type) or AGENT_MODELS.get(agent_type, "gpt-4o")
+
+
+def fight_card(card: Card, fight: Fight) -> Card:
+    """Single-fight view of a card carrying the same request options."""
+    return card.model_copy(update={"fights": [fight]})
+
+
+def as_dict(analysis) -> Dict[str, Any]:
+    return analysis.model_dump() if isinstance(analysis, BaseModel) else dict(analysis)
+
+
+async def emit_event(on_event: Optional[EventCallback], event: str, **data):
+    if on_event is not None:
+        await on_event({"event": event, **data})
+
+
+def merge_fight_outputs(per_fight: Dict[str, str]) -> str:
+    return "\n\n".join(f"[Fight {fight_id}]\n{text}" for fight_id, text in per_fight.items())
+
+
+def fight_mentions(fight: Fight) -> List[str]:
+    """Lowercase names an essay may use for a fight: its id and each fighter's full and last name."""
+    names = {fight.fight_id.lower()}
+    for fighter in (fight.fighter1, fight.fighter2):
+        parts = fighter.lower().split()
+        names.add(" ".join(parts))
+        if len(parts) > 1 and len(parts[-1]) > 2:
+            names.add(parts[-1])
+    return [name for name in names if name]
+
+
+def essay_for_fight(output: str, fight: Fight, fights: List[Fight]) -> str:
+    """The part of one agent's essay about ``fight``.
+
+    Sharded outputs are cut at their ``[Fight id]`` headers. In a whole-card
+    essay, a line naming a fight starts that fight's section and the lines after
+    it belong to the same section; the essay is kept whole if the fight is never named.
+    """
+    blocks = re.split(r"^\[Fight ([^\]\n]+)\]\n", output, flags=re.M)
+    if len(blocks) > 1:
+        sections = dict(zip(blocks[1::2], blocks[2::2]))
+        return sections.get(fight.fight_id, "(no analysis for this fight)").strip()
+
+    patterns = {
+        other.fight_id: re.compile("|".join(rf"\b{re.escape(name)}\b" for name in fight_mentions(other)))
+        for other in fights
+    }
+    current: set = set()
+    kept = []
+    for line in output.splitlines():
+        named = {fight_id for fight_id, pattern in patterns.items() if pattern.search(line.lower())}
+        if named:
+            current = named
+        if fight.fight_id in current:
+            kept.append(line)
+    return "\n".join(kept).strip() or output
+
+
+async def _run_bounded(agent_type: str, card: Card, on_event: Optional[EventCallback] = None,
+                       tracker: Optional[StageTracker] = None, fight_id: Optional[str] = None) -> str:
+    model_name = resolve_model(card, agent_type)
+    inputs = {"fights": [fight.model_dump() for fight in card.fights], "use_serper": card.use_serper}
+    if card.structured_evidence:
+        inputs["evidence_format"] = prompt_version(EVIDENCE_INSTRUCTIONS)
+
+    async def compute() -> str:
+        async with get_scheduler().slot():
+            return await run_analysis_agent(agent_type, card, model_name, card.use_serper, card.structured_evidence)
+
+    with trace_span(agent_type, "agent", fight_id=fight_id) as span:
+        output, reused = await get_stage_cache().run(
+            agent_type, model_name, inputs, compute, tracker, store_if=lambda o: not is_failed_output(o),
+            ttl=STAGE_CACHE_SETTINGS["search_ttl"] if card.use_serper else None
+        )
+        if span is not None:
+            span.args["cached"] = reused
+    extra = {"fight_id": fight_id} if fight_id else {}
+    await emit_event(on_event, "agent_completed", agent=agent_type, ok=not is_failed_output(output), cached=reused, **extra)
+    return output
+
+
+async def gather_within(jobs: Dict[Any, Awaitable[str]], timeout: Optional[float] = None) -> Tuple[Dict[Any, str], List[Any]]:
+    """Await all jobs, cancelling whichever are still running after ``timeout``.
+
+    Returns the outputs that arrived and the keys of the jobs that were dropped.
+    """
+    tasks = {key: asyncio.ensure_future(job) for key, job in jobs.items()}
+    if not tasks:
+        return {}, []
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    outputs = {key: task.result() for key, task in tasks.items() if task in done}
+    return outputs, [key for key, task in tasks.items() if task in pending]
+
+
+async def run_card_analysis(card: Card, on_event: Optional[EventCallback] = None,
+                            tracker: Optional[StageTracker] = None,
+                            timeout: Optional[float] = None) -> Tuple[Dict[str, str], List[str]]:
+    """Run each analysis agent once over the whole card; returns (outputs, dropped agents)."""
+    return await gather_within(
+        {agent_type: _run_bounded(agent_type, card, on_event, tracker) for agent_type in ANALYSIS_AGENT_TYPES},
+        timeout
+    )
+
+
+async def run_sharded_analysis(card: Card, on_event: Optional[EventCallback] = None,
+                               tracker: Optional[StageTracker] = None,
+                               timeout: Optional[float] = None) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    """Run each analysis agent once per fight; returns (agent_type -> fight_id -> output, dropped).
+
+    Every (agent, fight) pair is an independent call, so one slow or failed bout
+    only affects its own entry. Dropped pairs are reported as "agent:fight_id".
+    """
+    outputs, dropped = await gather_within(
+        {
+            (agent_type, fight.fight_id): _run_bounded(agent_type, fight_card(card, fight), on_event, tracker, fight.fight_id)
+            for agent_type in ANALYSIS_AGENT_TYPES for fight in card.fights
+        },
+        timeout
+    )
+
+    per_fight: Dict[str, Dict[str, str]] = {agent_type: {} for agent_type in ANALYSIS_AGENT_TYPES}
+    for (agent_type, fight_id), output in outputs.items():
+        per_fight[agent_type][fight_id] = output
+    return per_fight, [f"{agent_type}:{fight_id}" for agent_type, fight_id in dropped]
+
+
+async def run_analysis_stage(card: Card, on_event: Optional[EventCallback] = None,
+                             tracker: Optional[StageTracker] = None,
+                             timeout: Optional[float] = None) -> Tuple[Dict[str, str], List[str], List[str]]:
+    """Returns (usable outputs per agent, dropped at the deadline, failed).
+
+    When sharded, dropped and failed entries are "agent:fight_id" and the
+    remaining fights of that agent are still used.
+    """
+    if not card.shard_by_fight:
+        outputs, dropped = await run_card_analysis(card, on_event, tracker, timeout)
+        failed = [agent_type for agent_type, output in outputs.items() if is_failed_output(output)]
+        usable = {agent_type: output for agent_type, output in outputs.items() if agent_type not in failed}
+        return usable, dropped, failed
+
+    logger.info(f"Sharding {len(ANALYSIS_AGENT_TYPES)} agents across {len(card.fights)} fights")
+    per_fight, dropped = await run_sharded_analysis(card, on_event, tracker, timeout)
+    failed = [
+        f"{agent_type}:{fight_id}"
+        for agent_type, fights in per_fight.items() for fight_id, output in fights.items() if is_failed_output(output)
+    ]
+    usable = {}
+    for agent_type, fights in per_fight.items():
+        fights = {fight_id: output for fight_id, output in fights.items() if not is_failed_output(output)}
+        if fights:
+            usable[agent_type] = merge_evidence(fights) if card.structured_evidence else merge_fight_outputs(fights)
+    return usable, dropped, failed
+
+
+def order_agents(names: List[str]) -> List[str]:
+    return sorted(names, key=lambda name: (ANALYSIS_AGENT_TYPES.index(name.split(":")[0]), name))
+
+
+async def run_judge_stage(card: Card, outputs: Dict[str, str], tracker: Optional[StageTracker] = None,
+                          missing: Optional[List[str]] = None,
+                          on_event: Optional[EventCallback] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Judge the card from the usable analyses, told explicitly which ones are missing.
+
+    Returns (analyses, fight_ids the judge could not produce).
+    """
+    model_name = resolve_model(card, "judge")
+    missing = list(missing or [])
+    fight_ids = [fight.fight_id for fight in card.fights]
+    evidence = None
+    if card.structured_evidence:
+        evidence = {agent_type: parse_evidence(output) for agent_type, output in outputs.items()}
+        missing = order_agents(missing + [agent_type for agent_type, e in evidence.items() if e is None])
+        evidence = {agent_type: e for agent_type, e in evidence.items() if e is not None}
+
+    if card.judge_per_fight:
+        return await judge_fights(card, outputs, evidence, model_name, tracker, missing, on_event)
+
+    inputs = {"fight_ids": fight_ids, "analyses": outputs, "missing": missing, "structured": card.structured_evidence}
+
+    async def compute() -> List[Dict[str, Any]]:
+        async with get_scheduler().slot():
+            if evidence is not None:
+                analyses = await judge_evidence_agent(card, format_evidence(evidence, card.fights), model_name, missing=missing)
+            else:
+                analyses = await judge_agent(
+                    card, *[outputs.get(agent_type, "(unavailable)") for agent_type in ANALYSIS_AGENT_TYPES],
+                    model_name, missing=missing
+                )
+        return [as_dict(a) for a in analyses]
+
+    # an empty judge result means the call failed, so it is never stored
+    with trace_span("judge", "agent"):
+        analyses, _ = await get_stage_cache().run("judge", model_name, inputs, compute, tracker)
+    for analysis in analyses:
+        await emit_event(on_event, "fight_judged", fight_id=analysis["fight_id"], analysis=analysis)
+    judged = {analysis["fight_id"] for analysis in analyses}
+    return analyses, [fight_id for fight_id in fight_ids if fight_id not in judged]
+
+
+def checked_fight_analysis(analysis: FightAnalysis, fight: Fight) -> FightAnalysis:
+    """Reject a per-fight verdict that cannot be used as-is, so that fight is retried."""
+    if analysis.fight_id != fight.fight_id:
+        # the call was about this fight only, so a mislabelled id is safe to correct
+        analysis = analysis.model_copy(update={"fight_id": fight.fight_id})
+    analysis, problems = fight_problems(analysis, fight)
+    if problems:
+        raise ValueError(f"invalid verdict for {fight.fight_id}: {'; '.join(problems)}")
+    return analysis
+
+
+async def judge_fights(card: Card, outputs: Dict[str, str], evidence, model_name: str,
+                       tracker: Optional[StageTracker], missing: List[str],
+                       on_event: Optional[EventCallback]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """One judge call per fight, in parallel (JUDGE_SETTINGS["per_fight_concurrency"] per card).
+
+    Each fight sees only its own evidence, or its own sections of the essays.
+    A failed or invalid verdict is retried for that fight alone with exponential backoff.
+    """
+    semaphore = asyncio.Semaphore(JUDGE_SETTINGS["per_fight_concurrency"])
+    retries = JUDGE_SETTINGS["fight_retries"]
+
+    async def judge_one(fight: Fight) -> Dict[str, Any]:
+        if evidence is not None:
+            text = "\n".join(evidence_for_fight(evidence, fight.fight_id)) or "(no evidence)"
+        else:
+            text = analyses_section(*[
+                essay_for_fight(outputs[agent_type], fight, card.fights) if agent_type in outputs else "(unavailable)"
+                for agent_type in ANALYSIS_AGENT_TYPES
+            ])
+        inputs = {"fight": fight.model_dump(), "analyses": text, "missing": missing}
+
+        async def compute() -> Dict[str, Any]:
+            for attempt in range(retries + 1):
+                try:
+                    async with semaphore, get_scheduler().slot():
+                        analysis = await judge_fight_agent(fight, text, model_name, missing=missing)
+                    return as_dict(checked_fight_analysis(analysis, fight))
+                except Exception as e:
+                    logger.warning(f"Judge failed for {fight.fight_id} (attempt {attempt + 1}/{retries + 1}): {e}")
+                    if attempt < retries:
+                        await asyncio.sleep(JUDGE_SETTINGS["retry_backoff"] * 2 ** attempt)
+            return {}
+
+        with trace_span("judge", "agent", fight_id=fight.fight_id):
+            analysis, _ = await get_stage_cache().run("judge", model_name, inputs, compute, tracker)
+        if analysis:
+            await emit_event(on_event, "fight_judged", fight_id=fight.fight_id, analysis=analysis)
+        return analysis
+
+    results = await asyncio.gather(*(judge_one(fight) for fight in card.fights))
+    analyses = [analysis for analysis in results if analysis]
+    return analyses, [fight.fight_id for fight, analysis in zip(card.fights, results) if not analysis]
+
+
+async def run_post_stage(stage: str, card: Card, analyses: List[Dict[str, Any]],
+                         tracker: Optional[StageTracker] = None,
+                         timeout: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Returns (analyses, degraded).
+
+    On failure or timeout the local engine is applied instead and ``degraded``
+    says why: "dropped" when the stage overran its deadline share, "failed"
+    when the agent errored. It is None when the requested processing ran.
+    """
+    agent_fn, fallback_fn = {
+        "risk_scorer": (risk_scorer_agent, basic_risk_assessment),
+        "consistency_checker": (consistency_checker_agent, basic_consistency_check),
+    }[stage]
+    if card.post_processing == "local":
+        # Deterministic and fast enough that memoizing it would not pay off
+        if tracker is not None:
+            tracker.recomputed.add(stage)
+        with trace_span(stage, "agent", local=True):
+            return [as_dict(a) for a in fallback_fn(CardAnalysis(analyses=analyses).analyses)], None
+
+    model_name = resolve_model(card, stage)
+    # validated against the fights the judge produced, so unjudged fights are not invented here
+    judged_ids = {analysis["fight_id"] for analysis in analyses}
+    judged = card.model_copy(update={"fights": [f for f in card.fights if f.fight_id in judged_ids]})
+
+    async def compute() -> List[Dict[str, Any]]:
+        async with get_scheduler().slot():
+            return [as_dict(a) for a in await agent_fn(analyses, model_name, fallback=False, card=judged)]
+
+    try:
+        with trace_span(stage, "agent"):
+            result, _ = await asyncio.wait_for(get_stage_cache().run(stage, model_name, analyses, compute, tracker), timeout)
+        return result, None
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            logger.warning(f"{stage} overran its deadline share; applying local post-processing")
+        else:
+            logger.warning(f"{stage} failed ({e}); applying local post-processing")
+        # Local fallback output is never memoized
+        if tracker is not None:
+            tracker.recomputed.add(stage)
+        degraded = "dropped" if isinstance(e, asyncio.TimeoutError) else "failed"
+        return [as_dict(a) for a in fallback_fn(CardAnalysis(analyses=analyses).analyses)], degraded
+
+
+async def run_pipeline(card: Card, on_event: Optional[EventCallback] = None,
+                       checkpoints=None, owner: Optional[str] = None, refresh: bool = False) -> PipelineResult:
+    """Run the full analysis pipeline for a card.
+
+    ``checkpoints`` optionally persists each stage output for this run (see
+    StageTracker) so an interrupted job resumes instead of starting over.
+    ``refresh`` recomputes every stage instead of reusing memoized outputs.
+    Every agent call is queued on the global FairScheduler under ``owner``
+    (a fresh one per run by default), so concurrent cards share slots fairly.
+    With ``card.deadline_seconds`` set, each stage gets a share of the budget;
+    analysis agents that overrun it are dropped and the judge proceeds without them.
+    """
+    token = scheduling_owner.set(owner or new_owner())
+    substituted = set()
+    try:
+        with track_substitutions(substituted):
+            result = await _run_pipeline(card, on_event, StageTracker(checkpoints, refresh))
+    finally:
+        scheduling_owner.reset(token)
+    result.substituted_models = sorted(substituted)
+    return result
+
+
+async def _run_pipeline(card: Card, on_event: Optional[EventCallback], tracker: StageTracker) -> PipelineResult:
+    budget = DeadlineBudget(card.deadline_seconds) if card.deadline_seconds else None
+
+    await emit_event(on_event, "started", fights=len(card.fights))
+    with stage_timer("analysis"), trace_span("analysis", "stage"):
+        outputs, dropped, failed = await run_analysis_stage(card, on_event, tracker, budget.allot("analysis") if budget else None)
+    if dropped:
+        logger.warning(f"Dropped agents at deadline: {dropped}")
+        await emit_event(on_event, "agents_dropped", agents=dropped)
+    logger.info("Main agents completed")
+    await emit_event(on_event, "stage_completed", stage="analysis")
+
+    try:
+        with stage_timer("judge"), trace_span("judge", "stage"):
+            analyses, unjudged = await asyncio.wait_for(
+                run_judge_stage(card, outputs, tracker, order_agents(dropped + failed), on_event),
+                budget.allot("judge") if budget else None
+            )
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Judge did not finish within the {card.deadline_seconds}s deadline")
+    logger.info("Judge completed")
+    await emit_event(on_event, "stage_completed", stage="judge")
+
+    post_stages = ("risk_scorer", "consistency_checker")
+    post_failed = []
+    for i, stage in enumerate(post_stages):
+        # the post budget is shared evenly by whichever post stages are left
+        timeout = budget.allot("post") / (len(post_stages) - i) if budget else None
+        with stage_timer(stage), trace_span(stage, "stage"):
+            analyses, degraded = await run_post_stage(stage, card, analyses, tracker, timeout)
+        # either way the card got the local heuristic, not the requested LLM pass, so it is not cacheable
+        if degraded == "dropped":
+            dropped.append(stage)
+        elif degraded == "failed":
+            post_failed.append(stage)
+        await emit_event(on_event, "stage_completed", stage=stage)
+    logger.info(f"Post agents completed (recomputed: {tracker.recomputed_stages})")
+
+    return PipelineResult(
+        analyses=analyses,
+        failed_agents=order_agents(failed) + [f"judge:{fight_id}" for fight_id in unjudged] + post_failed,
+        dropped_agents=dropped,
+        recomputed_stages=tracker.recomputed_stages,
+        reused_stages=tracker.reused_stages
+    )
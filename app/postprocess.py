@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from app.config import LOCAL_POSTPROCESS_SETTINGS, RISK_RULES
+from app.models import FightAnalysis
+
+
+def fit_isotonic(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pool-adjacent-violators fit; returns the knots of a non-decreasing step curve."""
+    order = np.argsort(x, kind="mergesort")
+    x, y = x[order], y[order].astype(float)
+    # blocks of (sum of y, count, mean x)
+    sums, counts, xs = [], [], []
+    for xi, yi in zip(x, y):
+        sums.append(yi)
+        counts.append(1)
+        xs.append(xi)
+        while len(sums) > 1 and sums[-2] / counts[-2] > sums[-1] / counts[-1]:
+            s, c, xv = sums.pop(), counts.pop(), xs.pop()
+            xs[-1] = (xs[-1] * counts[-1] + xv * c) / (counts[-1] + c)
+            sums[-1] += s
+            counts[-1] += c
+    return np.array(xs), np.array(sums) / np.array(counts)
+
+
+def fit_platt(x: np.ndarray, y: np.ndarray, iterations: int = 50) -> Tuple[float, float]:
+    """Fit p = sigmoid(a * x + b) by Newton's method, with Platt's smoothed targets."""
+    positives = y.sum()
+    negatives = len(y) - positives
+    targets = np.where(y > 0, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+    a, b = 1.0, 0.0
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(a * x + b)))
+        w = np.maximum(p * (1 - p), 1e-12)
+        gradient = np.array([np.sum((p - targets) * x), np.sum(p - targets)])
+        hessian = np.array([[np.sum(w * x * x), np.sum(w * x)], [np.sum(w * x), np.sum(w)]])
+        step = np.linalg.solve(hessian + 1e-9 * np.eye(2), gradient)
+        a, b = a - step[0], b - step[1]
+        if np.abs(step).max() < 1e-8:
+            break
+    return float(a), float(b)
+
+
+class Calibrator:
+    """Maps a raw pick confidence (0-100) to the hit rate seen for it historically.
+
+    The curve is fitted with NumPy over historical picks, one JSON object per
+    line with ``confidence`` and ``correct``. Without enough history the
+    calibrator is the identity.
+    """
+
+    def __init__(self, method: str = "isotonic"):
+        self.method = method
+        self.samples = 0
+        self.fitted = False
+        self._knots: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._platt: Optional[Tuple[float, float]] = None
+
+    def fit(self, confidences: List[float], outcomes: List[bool]):
+        x = np.asarray(confidences, dtype=float) / 100.0
+        y = np.asarray(outcomes, dtype=float)
+        self.samples = len(x)
+        if self.method == "platt":
+            self._platt = fit_platt(x, y)
+        else:
+            self._knots = fit_isotonic(x, y)
+        self.fitted = True
+
+    def __call__(self, confidence: float) -> float:
+        if not self.fitted:
+            return confidence
+        x = confidence / 100.0
+        if self._platt is not None:
+            a, b = self._platt
+            p = 1 / (1 + np.exp(-(a * x + b)))
+        else:
+            p = np.interp(x, *self._knots)
+        return float(p) * 100.0
+
+    def describe(self) -> Dict:
+        info = {"method": self.method, "samples": self.samples, "fitted": self.fitted}
+        if self._platt is not None:
+            info["platt"] = {"a": round(self._platt[0], 4), "b": round(self._platt[1], 4)}
+        elif self._knots is not None:
+            info["isotonic"] = [[round(float(x) * 100, 1), round(float(p) * 100, 1)] for x, p in zip(*self._knots)]
+        return info
+
+
+def load_history(path: str) -> Tuple[List[float], List[bool]]:
+    confidences, outcomes = [], []
+    if not path or not os.path.exists(path):
+        return confidences, outcomes
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                confidences.append(float(record["confidence"]))
+                outcomes.append(bool(record["correct"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return confidences, outcomes
+
+
+class LocalPostProcessor:
+    """Deterministic stand-in for the risk scorer and consistency checker LLM passes.
+
+    ``assess_risk`` adds rule-based flags (RISK_RULES) and ``calibrate`` maps
+    confidences through the fitted calibration curve, then discounts for risk.
+    Both run in well under a millisecond per card and never call a model.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None, rules=None):
+        self.settings = settings or LOCAL_POSTPROCESS_SETTINGS
+        self.rules = RISK_RULES if rules is None else rules
+        self.calibrator = Calibrator(self.settings["method"])
+        confidences, outcomes = load_history(self.settings["history_path"])
+        if len(confidences) >= self.settings["min_samples"]:
+            self.calibrator.fit(confidences, outcomes)
+            logger.info(f"Fitted {self.settings['method']} calibration on {len(confidences)} historical picks")
+        elif confidences:
+            logger.warning(f"Only {len(confidences)} historical picks; confidence calibration disabled")
+
+    def assess_risk(self, analyses: List[FightAnalysis]) -> List[FightAnalysis]:
+        for analysis in analyses:
+            text = " ".join([analysis.path_to_victory, *analysis.props]).lower()
+            existing = {flag.lower() for flag in analysis.risk_flags}
+            new_flags = []
+            if analysis.confidence > self.settings["overconfidence_threshold"]:
+                new_flags.append("high confidence may indicate overestimation")
+            for keywords, flag in self.rules:
+                if any(keyword in text for keyword in keywords):
+                    new_flags.append(flag)
+            for flag in new_flags:
+                if flag.lower() not in existing:
+                    analysis.risk_flags.append(flag)
+                    existing.add(flag.lower())
+            if not analysis.risk_flags:
+                analysis.risk_flags.append("no major risks identified")
+        return analyses
+
+    def calibrate(self, analyses: List[FightAnalysis]) -> List[FightAnalysis]:
+        for analysis in analyses:
+            confidence = self.calibrator(analysis.confidence)
+            real_flags = [f for f in analysis.risk_flags if f != "no major risks identified"]
+            # the first flag is expected; each further one costs confidence
+            penalty = min(self.settings["max_penalty"], self.settings["flag_penalty"] * max(0, len(real_flags) - 1))
+            confidence -= penalty
+            analysis.confidence = int(round(min(100, max(self.settings["min_confidence"], confidence))))
+        return analyses
+
+    def fingerprint(self) -> str:
+        """Changes whenever the rules or fitted curve would change local results."""
+        material = json.dumps({
+            "settings": self.settings, "rules": self.rules, "calibration": self.calibrator.describe()
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+    def describe(self) -> Dict:
+        return {"calibration": self.calibrator.describe(), "rules": len(self.rules)}
+
+
+_post_processor: Optional[LocalPostProcessor] = None
+
+
+def get_post_processor() -> LocalPostProcessor:
+    global _post_processor
+    if _post_processor is None:
+        _post_processor = LocalPostProcessor()
+    return _post_processor
@@ -0,0 +1,22 @@
+from langchain_core.messages import SystemMessage
+from app.config import PROMPT_CACHE_SETTINGS
+from app.llm_providers import provider_for_model
+
+
+def uses_cache_breakpoint(model_name: str) -> bool:
+    """Whether calls to this model should carry an explicit cache_control breakpoint on the system prompt.
+
+    Only Anthropic needs one. OpenAI and Gemini cache a repeated prefix on their own,
+    which the agent layer keeps stable by always sending the static system prompt
+    (and tools) first and the card-specific content last. There is no size gate:
+    Anthropic ignores a breakpoint on a prefix below its minimum at no cost, and
+    the tool definitions it covers are not in our local estimate anyway.
+    """
+    return PROMPT_CACHE_SETTINGS["enabled"] and provider_for_model(model_name) == "anthropic"
+
+
+def cached_system_message(system_prompt: str) -> SystemMessage:
+    # The breakpoint covers the tool definitions too, which Anthropic places before the system prompt
+    return SystemMessage(content=[
+        {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+    ])
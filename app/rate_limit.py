@@ -0,0 +1,178 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from app.config import MODEL_RATE_LIMITS, PROVIDER_RATE_LIMITS
+from app.llm_providers import provider_for_model
+from app.tokens import estimate_tokens, usage_from_messages
+from app.tracing import trace_span
+
+# Seconds each provider request of the current agent call spent waiting here, when the caller collects them
+rate_limit_waits: ContextVar[Optional[List[float]]] = ContextVar("rate_limit_waits", default=None)
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` units per second up to ``per_minute``."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # a request larger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def debit(self, amount: float):
+        """Charge usage discovered after the call; may drive the bucket negative."""
+        self._refill()
+        self.tokens -= amount
+
+
+class Limiter:
+    """RPM + TPM buckets for one provider or model, with FIFO queueing."""
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = asyncio.Lock()
+        self.queued = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = max(
+                        self.requests.wait_time(1) if self.requests else 0.0,
+                        self.tokens.wait_time(estimated_tokens) if self.tokens else 0.0
+                    )
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                if self.requests:
+                    self.requests.take(1)
+                if self.tokens:
+                    self.tokens.take(estimated_tokens)
+        finally:
+            self.queued -= 1
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def debit_tokens(self, amount: int):
+        if self.tokens and amount > 0:
+            self.tokens.debit(amount)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queued,
+            "acquired": self.acquired,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+            "rpm_available": round(self.requests.tokens, 1) if self.requests else None,
+            "tpm_available": round(self.tokens.tokens, 1) if self.tokens else None
+        }
+
+
+class RateLimiter:
+    """Process-wide limiter shared by every agent call.
+
+    Calls are checked against the model's own limits (MODEL_RATE_LIMITS) and then
+    its provider's (PROVIDER_RATE_LIMITS). Instead of failing with 429s, callers
+    wait in line until both buckets have room for the estimated prompt.
+    """
+
+    def __init__(self):
+        self._limiters: Dict[str, Limiter] = {}
+
+    def _limiter(self, name: str, limits: Optional[Dict[str, float]]) -> Optional[Limiter]:
+        if not limits:
+            return None
+        if name not in self._limiters:
+            self._limiters[name] = Limiter(name, limits.get("rpm"), limits.get("tpm"))
+        return self._limiters[name]
+
+    def limiters_for(self, model_name: str) -> List[Limiter]:
+        provider = provider_for_model(model_name)
+        limiters = [
+            self._limiter(f"model:{model_name}", MODEL_RATE_LIMITS.get(model_name)),
+            self._limiter(f"provider:{provider}", PROVIDER_RATE_LIMITS.get(provider)),
+        ]
+        return [limiter for limiter in limiters if limiter is not None]
+
+    @asynccontextmanager
+    async def limit(self, model_name: str, estimated_tokens: int):
+        """Wait for capacity, then yield a callback to report the call's actual token usage."""
+        limiters = self.limiters_for(model_name)
+        waited = 0.0
+        with trace_span("rate_limit", "rate_limit", model=model_name):
+            for limiter in limiters:
+                waited += await limiter.acquire(estimated_tokens)
+        if waited > 1.0:
+            logger.info(f"Rate limiter held {model_name} call for {waited:.1f}s")
+        waits = rate_limit_waits.get()
+        if waits is not None:
+            waits.append(waited)
+
+        def report_usage(actual_tokens: int):
+            for limiter in limiters:
+                limiter.debit_tokens(actual_tokens - estimated_tokens)
+
+        yield report_usage
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in sorted(self._limiters.items())}
+
+
+def rate_limit_middleware(model_name: str):
+    """Agent middleware charging ``model_name``'s limits for every provider request an agent run makes.
+
+    A run with tool calls or structured-output retries sends several requests;
+    each one waits for capacity on its own estimated prompt (system prompt plus
+    the messages so far) and is then corrected with its reported usage.
+    """
+    from langchain.agents.middleware import wrap_model_call
+
+    @wrap_model_call(name="RateLimit")
+    async def rate_limited(request, handler):
+        messages = ([request.system_message] if request.system_message else []) + list(request.messages)
+        estimated_tokens = sum(estimate_tokens(message.text) for message in messages)
+        async with get_rate_limiter().limit(model_name, estimated_tokens) as report_usage:
+            response = await handler(request)
+            report_usage(usage_from_messages(response.result)["total_tokens"] or estimated_tokens)
+        return response
+
+    return rate_limited
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,106 @@
+import hashlib
+import inspect
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from loguru import logger
+from app import agents, prompts
+from app.cache import build_cache
+from app.card_format import CARD_FORMAT_VERSION
+from app.evidence import EVIDENCE_INSTRUCTIONS
+from app.config import AGENT_MODELS, RESULT_CACHE_SETTINGS, STAGE_CACHE_SETTINGS, get_temperature_for_agent
+from app.models import Card
+from app.postprocess import get_post_processor
+
+CACHE_STATUS_NAME = "ufc-analysis"
+
+
+@lru_cache(maxsize=1)
+def prompt_fingerprint() -> str:
+    """Hash of every system prompt the pipeline sends, so prompt edits invalidate cached results."""
+    sources = inspect.getsource(prompts) + agents.JUDGE_SYSTEM_PROMPT \
+        + agents.RISK_SCORER_SYSTEM_PROMPT + agents.CONSISTENCY_CHECKER_SYSTEM_PROMPT + CARD_FORMAT_VERSION + EVIDENCE_INSTRUCTIONS
+    return hashlib.sha256(sources.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_agent_models(card: Card) -> Dict[str, str]:
+    overrides = card.agent_models.model_dump(exclude_none=True) if card.agent_models else {}
+    return {agent_type: overrides.get(agent_type, default) for agent_type, default in AGENT_MODELS.items()}
+
+
+def card_cache_key(card: Card) -> str:
+    """Content address of a card analysis: everything that can change the result."""
+    models = resolve_agent_models(card)
+    material = {
+        "fights": [fight.model_dump() for fight in card.fights],
+        "use_serper": card.use_serper,
+        "shard_by_fight": card.shard_by_fight,
+        "structured_evidence": card.structured_evidence,
+        "judge_per_fight": card.judge_per_fight,
+        "post_processing": card.post_processing,
+        "models": models,
+        "temperatures": {agent_type: get_temperature_for_agent(agent_type) for agent_type in models},
+        "prompts": prompt_fingerprint()
+    }
+    if card.post_processing == "local":
+        material["local_post_processing"] = get_post_processor().fingerprint()
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def ttl_for_card(card: Card) -> Optional[float]:
+    """Result lifetime for this card: no longer than its search-backed stage outputs when it used Serper."""
+    if card.use_serper:
+        return min(RESULT_CACHE_SETTINGS["ttl"], STAGE_CACHE_SETTINGS["search_ttl"])
+    return None
+
+
+def cache_status(hit: bool, stored: bool = False, detail: Optional[str] = None) -> str:
+    """Cache-Status header value (RFC 9211)."""
+    if hit:
+        return f"{CACHE_STATUS_NAME}; hit"
+    value = f"{CACHE_STATUS_NAME}; fwd=miss" if detail is None else f"{CACHE_STATUS_NAME}; fwd={detail}"
+    return value + "; stored" if stored else value
+
+
+class ResultCache:
+    def __init__(self):
+        self.enabled = RESULT_CACHE_SETTINGS["enabled"]
+        self._store = build_cache(
+            RESULT_CACHE_SETTINGS["backend"],
+            max_size=RESULT_CACHE_SETTINGS["max_entries"],
+            default_ttl=RESULT_CACHE_SETTINGS["ttl"],
+            path=RESULT_CACHE_SETTINGS["path"],
+            table="card_results",
+            disk_max_size=RESULT_CACHE_SETTINGS["disk_max_entries"]
+        ) if self.enabled else None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._store is None:
+            return None
+        return self._store.get(key)
+
+    def set(self, key: str, result: Dict[str, Any], ttl: Optional[float] = None):
+        if self._store is not None:
+            self._store.set(key, result, ttl)
+            logger.info(f"Cached card analysis {key[:12]}")
+
+    def invalidate(self, key: str) -> bool:
+        return self._store.delete(key) if self._store is not None else False
+
+    def clear(self):
+        if self._store is not None:
+            self._store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._store.stats() if self._store is not None else {"enabled": False}
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Hashable, Optional
+from app.config import AGENT_CONCURRENCY_LIMIT
+from app.tracing import trace_span
+
+# Who the current agent call is scheduled for (one owner per pipeline run)
+scheduling_owner: ContextVar[Hashable] = ContextVar("scheduling_owner", default="default")
+
+_owner_ids = itertools.count(1)
+
+
+def new_owner(prefix: str = "run") -> str:
+    return f"{prefix}-{next(_owner_ids)}"
+
+
+class FairScheduler:
+    """Global concurrency limit with round-robin hand-off between owners.
+
+    When every slot is busy, waiters queue per owner and freed slots go to the
+    owners in turn, so one large card cannot starve the cards queued behind it.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self.granted = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def acquire(self, owner: Hashable):
+        if self.in_flight < self.limit and not self._queues:
+            self.in_flight += 1
+            self.granted += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(owner, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed to us just as we were cancelled; pass it on
+                self.release()
+            else:
+                self._discard(owner, future)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        while self._queues and self.in_flight < self.limit:
+            owner, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            # rotate: the owner goes to the back of the line
+            del self._queues[owner]
+            if queue:
+                self._queues[owner] = queue
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            self.granted += 1
+            future.set_result(None)
+
+    def _discard(self, owner: Hashable, future: asyncio.Future):
+        queue = self._queues.get(owner)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._queues[owner]
+
+    @asynccontextmanager
+    async def slot(self, owner: Optional[Hashable] = None):
+        with trace_span("queue", "queue"):
+            await self.acquire(owner if owner is not None else scheduling_owner.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "waiting_owners": len(self._queues),
+            "granted": self.granted
+        }
+
+
+_scheduler: Optional[FairScheduler] = None
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler(AGENT_CONCURRENCY_LIMIT)
+    return _scheduler
@@ -0,0 +1,171 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from loguru import logger
+from pydantic import BaseModel
+from app.cache import SingleFlight, TTLCache
+from app.cassette import get_cassette
+from app.config import SERPER_CACHE_SETTINGS, SERPER_SETTINGS, get_api_key
+from app.metrics import SERPER_LATENCY, SERPER_REQUESTS, record_error
+
+
+class SearchResult(BaseModel):
+    position: int
+    title: str = ""
+    link: str = ""
+    snippet: str = ""
+    date: Optional[str] = None
+
+
+class SerperNotConfigured(RuntimeError):
+    pass
+
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace/punctuation-insensitive form used as the cache key."""
+    query = re.sub(r"[^\w\s'-]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def ttl_for_query(normalized_query: str) -> float:
+    for keywords, ttl in SERPER_CACHE_SETTINGS["ttl_rules"]:
+        if any(keyword in normalized_query for keyword in keywords):
+            return ttl
+    return SERPER_CACHE_SETTINGS["default_ttl"]
+
+
+class SerperClient:
+    """Async Serper client sharing one keep-alive connection pool.
+
+    ``max_concurrency`` caps in-flight searches across every agent and request;
+    ``total_timeout`` bounds a search including the time spent waiting for a slot.
+    Results are cached per normalized query, and identical queries issued while
+    one is already in flight share that single upstream call.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_concurrency: Optional[int] = None, total_timeout: Optional[float] = None):
+        self.api_key = api_key
+        self.base_url = (base_url or SERPER_SETTINGS["base_url"]).rstrip("/")
+        self.total_timeout = total_timeout or SERPER_SETTINGS["total_timeout"]
+        self._max_concurrency = max_concurrency or SERPER_SETTINGS["max_concurrency"]
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = TTLCache(max_size=SERPER_CACHE_SETTINGS["max_entries"]) if SERPER_CACHE_SETTINGS["enabled"] else None
+        self._single_flight = SingleFlight()
+        self.upstream_calls = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(SERPER_SETTINGS["request_timeout"], connect=SERPER_SETTINGS["connect_timeout"]),
+                limits=httpx.Limits(
+                    max_connections=SERPER_SETTINGS["max_connections"],
+                    max_keepalive_connections=SERPER_SETTINGS["max_connections"]
+                )
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    async def search(self, query: str, num: Optional[int] = None) -> List[SearchResult]:
+        api_key = self.api_key or get_api_key("serper")
+        if not api_key and not get_cassette().replaying:
+            raise SerperNotConfigured("Serper API key not configured")
+        num = num or SERPER_SETTINGS["num_results"]
+        if self.cache is None:
+            return await self._fetch(query, num, api_key)
+
+        normalized = normalize_query(query)
+        key = (normalized, num)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"Serper cache hit for: {normalized}")
+            SERPER_REQUESTS.labels("cache_hit").inc()
+            return cached
+
+        results = await self._single_flight.do(key, lambda: self._fetch(query, num, api_key))
+        self.cache.set(key, results, ttl=ttl_for_query(normalized))
+        return results
+
+    async def _fetch(self, query: str, num: int, api_key: str) -> List[SearchResult]:
+        started = time.monotonic()
+        try:
+            results = await asyncio.wait_for(self._search(query, num, api_key), self.total_timeout)
+        except Exception as e:
+            SERPER_REQUESTS.labels("error").inc()
+            record_error("serper", e)
+            raise
+        SERPER_REQUESTS.labels("upstream").inc()
+        SERPER_LATENCY.observe(time.monotonic() - started)
+        return results
+
+    async def _search(self, query: str, num: int, api_key: str) -> List[SearchResult]:
+        organic = await get_cassette().call("serper", {"q": normalize_query(query), "num": num},
+                                            lambda: self._post(query, num, api_key))
+        return [
+            SearchResult(
+                position=item.get("position", i),
+                title=item.get("title", ""),
+                link=item.get("link", ""),
+                snippet=item.get("snippet", ""),
+                date=item.get("date")
+            )
+            for i, item in enumerate(organic, 1)
+        ]
+
+    async def _post(self, query: str, num: int, api_key: str) -> List[Dict[str, Any]]:
+        async with self.semaphore:
+            self.upstream_calls += 1
+            response = await self.client.post(
+                "/search",
+                json={"q": query, "num": num},
+                headers={"X-API-KEY": api_key}
+            )
+            response.raise_for_status()
+        return response.json().get("organic", [])
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats() if self.cache is not None else {"enabled": False}
+        stats["coalesced"] = self._single_flight.coalesced
+        stats["inflight"] = len(self._single_flight)
+        stats["upstream_calls"] = self.upstream_calls
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def format_results(results: List[SearchResult]) -> str:
+    """Render results the way agents have always seen them in tool messages."""
+    if not results:
+        return "No results found"
+    return "\n\n".join(f"{r.position}. {r.title} - {r.snippet}\n   {r.link}" for r in results)
+
+
+_client: Optional[SerperClient] = None
+
+
+def get_serper_client() -> SerperClient:
+    global _client
+    if _client is None:
+        _client = SerperClient()
+    return _client
+
+
+async def close_serper_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Closed Serper client")
@@ -0,0 +1,127 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from app.agent_registry import prompt_version
+from app.agents import system_prompt_for, track_substitutions
+from app.cache import build_cache
+from app.card_format import CARD_FORMAT_VERSION
+from app.config import STAGE_CACHE_SETTINGS, get_temperature_for_agent
+
+# Pipeline order, used to report stages consistently
+STAGES = [
+    "tape_study", "stats_trends", "news_weighins", "style_matchup", "market_odds",
+    "judge", "risk_scorer", "consistency_checker"
+]
+
+
+def stage_key(stage: str, model_name: str, inputs: Any) -> str:
+    """Key made only of what the stage itself consumes: its inputs, model, temperature and prompt."""
+    material = {
+        "stage": stage,
+        "model": model_name,
+        "temperature": get_temperature_for_agent(stage),
+        "prompt": prompt_version(system_prompt_for(stage)),
+        "card_format": CARD_FORMAT_VERSION,
+        "inputs": inputs
+    }
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class StageTracker:
+    """Records which stages one pipeline run executed and which it reused.
+
+    ``checkpoints`` is an optional per-run store (anything with ``get``/``set``)
+    consulted before the shared cache and always written on success, so a run
+    that is interrupted can resume from its last completed stage. With
+    ``refresh`` (a ``Cache-Control: no-cache`` request) the shared cache is not
+    read, only written.
+    """
+
+    def __init__(self, checkpoints=None, refresh: bool = False):
+        self.recomputed = set()
+        self.reused = set()
+        self.checkpoints = checkpoints
+        self.refresh = refresh
+
+    def ordered(self, stages) -> List[str]:
+        return [stage for stage in STAGES if stage in stages]
+
+    @property
+    def recomputed_stages(self) -> List[str]:
+        return self.ordered(self.recomputed)
+
+    @property
+    def reused_stages(self) -> List[str]:
+        return self.ordered(self.reused - self.recomputed)
+
+
+class StageCache:
+    def __init__(self):
+        self.enabled = STAGE_CACHE_SETTINGS["enabled"]
+        self._store = build_cache(
+            STAGE_CACHE_SETTINGS["backend"],
+            max_size=STAGE_CACHE_SETTINGS["max_entries"],
+            default_ttl=STAGE_CACHE_SETTINGS["ttl"],
+            path=STAGE_CACHE_SETTINGS["path"],
+            table="stage_outputs",
+            disk_max_size=STAGE_CACHE_SETTINGS["disk_max_entries"]
+        ) if self.enabled else None
+
+    async def run(self, stage: str, model_name: str, inputs: Any, compute: Callable[[], Awaitable[Any]],
+                  tracker: Optional[StageTracker] = None, store_if: Callable[[Any], bool] = bool,
+                  ttl: Optional[float] = None) -> Tuple[Any, bool]:
+        """Return ``(output, reused)`` for this stage invocation, computing it on a miss.
+
+        ``compute`` must return a JSON-serializable value; it is only stored when
+        ``store_if`` accepts it, so failed or degraded outputs are recomputed next time.
+        ``ttl`` overrides the shared cache's lifetime for this entry. An output that
+        any fallback or hedge model contributed to is kept out of the shared cache,
+        whose key names only the requested model; the run's checkpoints still get it.
+        """
+        checkpoints = tracker.checkpoints if tracker is not None else None
+        refresh = tracker is not None and tracker.refresh
+        stores = [store for store in (checkpoints, self._store) if store is not None]
+        key = stage_key(stage, model_name, inputs) if stores else None
+        for store in stores:
+            if refresh and store is self._store:
+                continue
+            cached = store.get(key)
+            if cached is not None:
+                logger.info(f"Reusing memoized {stage} output ({key[:12]})")
+                if tracker is not None:
+                    tracker.reused.add(stage)
+                if store is not checkpoints and checkpoints is not None:
+                    checkpoints.set(key, cached)
+                return cached, True
+
+        substituted = set()
+        with track_substitutions(substituted):
+            value = await compute()
+        if tracker is not None:
+            tracker.recomputed.add(stage)
+        if store_if(value):
+            for store in stores:
+                if substituted and store is self._store:
+                    logger.info(f"Not memoizing {stage} output served by {sorted(substituted)}")
+                    continue
+                store.set(key, value, ttl)
+        return value, False
+
+    def clear(self):
+        if self._store is not None:
+            self._store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._store.stats() if self._store is not None else {"enabled": False}
+
+
+_stage_cache: Optional[StageCache] = None
+
+
+def get_stage_cache() -> StageCache:
+    global _stage_cache
+    if _stage_cache is None:
+        _stage_cache = StageCache()
+    return _stage_cache
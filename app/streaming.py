@@ -0,0 +1,58 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+from loguru import logger
+
+# Idle interval after which a heartbeat is sent so proxies keep the stream open
+HEARTBEAT_INTERVAL = 15.0
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_DONE = object()
+
+
+def format_event(event: Dict[str, Any], sse: bool) -> str:
+    payload = json.dumps(event, default=str)
+    if sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def heartbeat(sse: bool) -> str:
+    return ": keep-alive\n\n" if sse else format_event({"event": "heartbeat"}, sse=False)
+
+
+async def stream_events(producer: Callable[[Callable[[Dict[str, Any]], Awaitable[None]]], Awaitable[Dict[str, Any]]],
+                        sse: bool = False) -> AsyncIterator[str]:
+    """Run ``producer`` in the background and yield its events as they happen.
+
+    ``producer`` receives an event callback and returns the final event, which is
+    always the last one streamed. Failures become an ``error`` event, and the
+    producer is cancelled if the client goes away mid-stream.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            await queue.put(await producer(queue.put))
+        except Exception as e:
+            logger.error(f"Streaming pipeline failed: {e}")
+            await queue.put({"event": "error", "detail": str(e)})
+        finally:
+            await queue.put(_DONE)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield heartbeat(sse)
+                continue
+            if event is _DONE:
+                break
+            yield format_event(event, sse)
+    finally:
+        task.cancel()
@@ -0,0 +1,79 @@
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional
+
+# Rough average for English prose across the providers' tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap provider-agnostic token estimate used before any call is made."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+class PromptBudgetExceeded(Exception):
+    pass
+
+
+def check_prompt_budget(agent_type: str, estimated_tokens: int, budget: int):
+    """Refuse a call before it reaches the provider when its prompt is over budget."""
+    if estimated_tokens > budget:
+        raise PromptBudgetExceeded(
+            f"{agent_type} prompt is ~{estimated_tokens} tokens, over its budget of {budget}"
+        )
+
+
+def usage_from_messages(messages: Iterable[Any]) -> Dict[str, int]:
+    """Sum provider-reported token usage over the AI messages of an agent run."""
+    usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0}
+    for message in messages:
+        metadata = getattr(message, "usage_metadata", None)
+        if not metadata:
+            continue
+        usage["input_tokens"] += metadata.get("input_tokens", 0)
+        usage["output_tokens"] += metadata.get("output_tokens", 0)
+        usage["total_tokens"] += metadata.get("total_tokens", 0)
+        details = metadata.get("input_token_details") or {}
+        usage["cache_read_tokens"] += details.get("cache_read", 0) or 0
+        usage["cache_write_tokens"] += details.get("cache_creation", 0) or 0
+    return usage
+
+
+class UsageTracker:
+    """Token usage per (agent, model), split into cached and uncached input."""
+
+    def __init__(self):
+        self._usage: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "calls": 0, "input_tokens": 0, "cached_input_tokens": 0,
+            "cache_write_tokens": 0, "uncached_input_tokens": 0, "output_tokens": 0
+        })
+
+    def record(self, agent_type: str, model_name: str, usage: Dict[str, int]):
+        entry = self._usage[f"{agent_type}:{model_name}"]
+        entry["calls"] += 1
+        entry["input_tokens"] += usage["input_tokens"]
+        entry["cached_input_tokens"] += usage["cache_read_tokens"]
+        entry["cache_write_tokens"] += usage["cache_write_tokens"]
+        entry["uncached_input_tokens"] += uncached_input_tokens(usage)
+        entry["output_tokens"] += usage["output_tokens"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            key: {**entry, "cache_hit_ratio": round(entry["cached_input_tokens"] / entry["input_tokens"], 3) if entry["input_tokens"] else 0.0}
+            for key, entry in sorted(self._usage.items())
+        }
+
+
+def uncached_input_tokens(usage: Dict[str, int]) -> int:
+    # Providers count cache reads and writes inside input_tokens
+    return max(0, usage["input_tokens"] - usage["cache_read_tokens"] - usage["cache_write_tokens"])
+
+
+_usage_tracker: Optional[UsageTracker] = None
+
+
+def get_usage_tracker() -> UsageTracker:
+    global _usage_tracker
+    if _usage_tracker is None:
+        _usage_tracker = UsageTracker()
+    return _usage_tracker
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from app.config import PROFILE_SETTINGS
+
+TRACE_FILE_PATTERN = re.compile(r"^[\w-]+\.trace\.json$")
+
+
+class Span:
+    __slots__ = ("name", "cat", "start", "end", "parent", "args", "lane")
+
+    def __init__(self, name: str, cat: str, start: float, parent: Optional["Span"], args: Dict[str, Any], lane: int):
+        self.name = name
+        self.cat = cat
+        self.start = start
+        self.end = start
+        self.parent = parent
+        self.args = args
+        self.lane = lane
+
+    @property
+    def ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+
+class RequestTrace:
+    """Span tree for one request, recorded only when the caller opted in.
+
+    Spans nest through a ContextVar, so the tasks spawned for parallel agents
+    inherit their parent span without any explicit plumbing.
+    """
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lanes: Dict[int, int] = {}
+
+    def lane(self) -> int:
+        # one row per asyncio task in trace viewers
+        try:
+            task_id = id(asyncio.current_task())
+        except RuntimeError:
+            task_id = 0
+        return self._lanes.setdefault(task_id, len(self._lanes) + 1)
+
+    def children(self, span: Span, cat: str) -> List[Span]:
+        found = []
+        for candidate in self.spans:
+            parent = candidate.parent
+            while parent is not None and parent is not span:
+                parent = parent.parent
+            if parent is span and candidate.cat == cat:
+                found.append(candidate)
+        return sorted(found, key=lambda s: s.start)
+
+    def summary(self) -> Dict[str, Any]:
+        """The ``timings`` block: wall time per stage and per agent, with where the agent's time went."""
+        def r(ms: float) -> float:
+            return round(float(ms), 1)
+
+        agents = {}
+        for span in sorted((s for s in self.spans if s.cat == "agent"), key=lambda s: s.start):
+            key = f"{span.name}:{span.args['fight_id']}" if span.args.get("fight_id") else span.name
+            providers = self.children(span, "provider")
+            first_token = next((p.args["ttft_ms"] for p in providers if p.args.get("ttft_ms") is not None), None)
+            # rate-limit waits happen inside the provider span, before each request of the run
+            rate_limit_ms = sum(s.ms for s in self.children(span, "rate_limit"))
+            entry = {
+                "wall_ms": r(span.ms),
+                "queue_ms": r(sum(s.ms for s in self.children(span, "queue"))),
+                "rate_limit_ms": r(rate_limit_ms),
+                "provider_ms": r(sum(p.ms for p in providers) - rate_limit_ms),
+                "ttft_ms": r(first_token) if first_token is not None else None,
+                "models": sorted({p.args.get("model") for p in providers if p.args.get("model")}),
+                "tool_calls": [{"tool": t.name, "query": t.args.get("query"), "ms": r(t.ms)} for t in self.children(span, "tool")]
+            }
+            if span.args.get("cached"):
+                entry["cached"] = True
+            agents[key] = entry
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": r((time.perf_counter() - self.started) * 1000),
+            "stages": {s.name: r(s.ms) for s in sorted(self.spans, key=lambda s: s.start) if s.cat == "stage"},
+            "agents": agents,
+            "serialization_ms": r(sum(s.ms for s in self.spans if s.cat == "serialize"))
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: total, each stage, queueing and serialization."""
+        summary = self.summary()
+        metrics = [f'total;dur={summary["total_ms"]}']
+        metrics += [f'{stage};dur={ms}' for stage, ms in summary["stages"].items()]
+        queue = sum(s.ms for s in self.spans if s.cat in ("queue", "rate_limit"))
+        metrics.append(f'queue;dur={round(queue, 1)};desc="scheduler + rate limit wait, summed over agents"')
+        metrics.append(f'serialize;dur={summary["serialization_ms"]}')
+        return ", ".join(metrics)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Trace Event Format, openable in Perfetto or chrome://tracing."""
+        events = [
+            {
+                "name": s.name, "cat": s.cat, "ph": "X", "pid": 1, "tid": s.lane,
+                "ts": round((s.start - self.started) * 1e6, 1), "dur": round((s.end - s.start) * 1e6, 1),
+                "args": {k: v for k, v in s.args.items() if v is not None}
+            }
+            for s in sorted(self.spans, key=lambda s: s.start)
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+    def dump(self, directory: Optional[str] = None) -> str:
+        """Write the trace under ``directory`` (default ``PROFILE_DIR``) and return the file name."""
+        directory = directory or PROFILE_SETTINGS["dir"]
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.trace_id}.trace.json"
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return name
+
+
+def trace_file(name: str, directory: Optional[str] = None) -> Optional[str]:
+    """Path of a dumped trace by file name; None for anything that is not one (no paths, no other files)."""
+    if not TRACE_FILE_PATTERN.match(name):
+        return None
+    path = os.path.join(directory or PROFILE_SETTINGS["dir"], name)
+    return path if os.path.isfile(path) else None
+
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def trace_span(name: str, cat: str, **args):
+    """Record a span under the current request trace; a no-op when tracing is off."""
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    span = Span(name, cat, time.perf_counter(), _current_span.get(), args, trace.lane())
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        span.end = time.perf_counter()
+        _current_span.reset(token)
+        trace.spans.append(span)
+
+
+@contextmanager
+def request_trace(enabled: bool):
+    """Start a trace for the current request when ``enabled``; yields it (or None)."""
+    if not enabled:
+        yield None
+        return
+    trace = RequestTrace()
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from app.models import Card, Fight, FightAnalysis
+
+
+class ValidationReport(BaseModel):
+    """Entries that passed, and what is wrong with every fight that did not."""
+    valid: List[FightAnalysis] = []
+    problems: Dict[str, List[str]] = {}
+    previous: Dict[str, FightAnalysis] = {}  # the invalid entry as returned, if there was one
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def fight_problems(analysis: FightAnalysis, fight: Fight) -> Tuple[FightAnalysis, List[str]]:
+    """Check one entry against its fight; harmless differences (pick casing/spacing) are normalized."""
+    problems = []
+    fighters = {_normalize(fight.fighter1): fight.fighter1, _normalize(fight.fighter2): fight.fighter2}
+    pick = fighters.get(_normalize(analysis.pick))
+    if pick is None:
+        problems.append(f"pick {analysis.pick!r} is not {fight.fighter1!r} or {fight.fighter2!r}")
+    elif pick != analysis.pick:
+        analysis = analysis.model_copy(update={"pick": pick})
+    if not 0 <= analysis.confidence <= 100:
+        problems.append(f"confidence {analysis.confidence} is outside 0-100")
+    return analysis, problems
+
+
+def validate_analyses(analyses: List[FightAnalysis], card: Card) -> ValidationReport:
+    """Check a structured answer against the card: every fight present once, valid picks and confidences.
+
+    Entries for fight_ids not on the card are discarded; the fights they were
+    probably meant for show up as missing.
+    """
+    fights = {fight.fight_id: fight for fight in card.fights}
+    report = ValidationReport()
+    seen = set()
+    for analysis in analyses:
+        fight = fights.get(analysis.fight_id)
+        if fight is None or analysis.fight_id in seen:
+            continue
+        seen.add(analysis.fight_id)
+        analysis, problems = fight_problems(analysis, fight)
+        if problems:
+            report.problems[fight.fight_id] = problems
+            report.previous[fight.fight_id] = analysis
+        else:
+            report.valid.append(analysis)
+    for fight_id in fights:
+        if fight_id not in seen:
+            report.problems[fight_id] = ["missing from the answer"]
+    return report
+
+
+def ordered(analyses: List[FightAnalysis], card: Card) -> List[FightAnalysis]:
+    order = {fight.fight_id: i for i, fight in enumerate(card.fights)}
+    return sorted(analyses, key=lambda a: order.get(a.fight_id, len(order)))
+
+
+def repair_request(card: Card, report: ValidationReport, context: Optional[str] = None) -> str:
+    """Small follow-up prompt naming only the broken entries and what is wrong with them."""
+    fights = {fight.fight_id: fight for fight in card.fights}
+    entries = []
+    for fight_id, problems in report.problems.items():
+        fight = fights[fight_id]
+        entry = f"Fight {fight_id}: {fight.fighter1} vs {fight.fighter2}\nProblems: {'; '.join(problems)}"
+        if fight_id in report.previous:
+            entry += f"\nPrevious entry: {report.previous[fight_id].model_dump_json()}"
+        entries.append(entry)
+    request = (
+        "Some entries in your previous answer were invalid. Return corrected entries for these fights only.\n\n"
+        + "\n\n".join(entries)
+        + "\n\nUse each fight_id exactly as given, a pick that is exactly one of the two fighter names, "
+          "and an integer confidence from 0 to 100. Keep everything else about the analysis unchanged."
+    )
+    if context and any(fight_id not in report.previous for fight_id in report.problems):
+        # a missing fight cannot be fixed without the material it should have been based on
+        request += f"\n\nThe original request, for reference:\n{context}"
+    return request
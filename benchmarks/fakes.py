@@ -0,0 +1,222 @@
+"""Deterministic stand-ins for the chat models, for offline benchmarks.
+
+``install_fake_llms`` swaps the models handed to ``create_agent`` for
+``FakeChatModel`` instances. Each fake sleeps for a latency drawn from its
+model's distribution, fails at the configured rate, reports token usage like a
+provider would, and answers with content the pipeline accepts: essays for the
+analysis agents, tool calls for ``serper_search`` and for the structured
+output schemas (CardAnalysis, FightAnalysis, AgentEvidence).
+
+Fights have to be registered with ``register_fights`` so the fakes can pick
+one of the two fighters; fight ids are recognised wherever they appear in a
+prompt.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, ConfigDict, Field
+from app.tokens import estimate_tokens
+
+# fight_id -> (fighter1, fighter2)
+FIGHT_BOOK: Dict[str, Tuple[str, str]] = {}
+
+FILLER = ("Footwork, output and cardio trends were weighed against the opponent's recent form, "
+          "durability and the judging tendencies for this venue. ")
+
+
+class FakeProviderError(RuntimeError):
+    status_code = 503  # counted by the circuit breakers like a provider outage
+
+
+class FakeBehavior(BaseModel):
+    """How one fake model behaves. Latency is lognormal around ``median`` seconds."""
+    median: float = 0.05
+    spread: float = 0.4  # sigma of the underlying normal; 0 makes every call take ``median``
+    output_tokens: int = 400
+    failure_rate: float = 0.0
+    searches: int = 1  # serper_search calls per agent run when the tool is offered
+
+    def latency(self, rng: random.Random) -> float:
+        if self.spread <= 0:
+            return self.median
+        return self.median * rng.lognormvariate(0.0, self.spread)
+
+
+def register_fights(fights: List[Dict[str, Any]]):
+    for fight in fights:
+        FIGHT_BOOK[fight["fight_id"]] = (fight["fighter1"], fight["fighter2"])
+
+
+def _seed(*parts: Any) -> int:
+    return zlib.crc32(":".join(str(p) for p in parts).encode("utf-8"))
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+
+def fights_in(text: str) -> List[str]:
+    seen = []
+    for token in re.findall(r"[\w-]+", text):
+        if token in FIGHT_BOOK and token not in seen:
+            seen.append(token)
+    return seen
+
+
+def _lean(fight_id: str, model_name: str) -> Tuple[str, int]:
+    fighter1, fighter2 = FIGHT_BOOK[fight_id]
+    h = _seed(fight_id, model_name)
+    return (fighter1 if h % 2 else fighter2), 52 + h % 37
+
+
+def fight_analysis(fight_id: str, model_name: str) -> Dict[str, Any]:
+    pick, confidence = _lean(fight_id, model_name)
+    return {
+        "fight_id": fight_id,
+        "pick": pick,
+        "confidence": confidence,
+        "path_to_victory": f"{pick} wins a decision on volume and late-round cardio.",
+        "risk_flags": [],
+        "props": ["Fight goes the distance"]
+    }
+
+
+def fight_evidence(fight_id: str, model_name: str) -> Dict[str, Any]:
+    lean, strength = _lean(fight_id, model_name)
+    return {
+        "fight_id": fight_id,
+        "lean": lean,
+        "lean_strength": strength,
+        "key_factors": ["volume", "cardio"],
+        "signals": {"strike_differential": round(strength / 20 - 2.5, 2)},
+        "citations": []
+    }
+
+
+STRUCTURED_ANSWERS = {
+    "CardAnalysis": lambda ids, model: {"analyses": [fight_analysis(f, model) for f in ids]},
+    "FightAnalysis": lambda ids, model: fight_analysis(ids[0], model),
+    "AgentEvidence": lambda ids, model: {"fights": [fight_evidence(f, model) for f in ids]}
+}
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with a latency distribution, failure rate and token counts, and no network."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model_name: str
+    behavior: FakeBehavior = Field(default_factory=FakeBehavior)
+    tool_names: List[str] = Field(default_factory=list)
+    rng: random.Random = Field(default_factory=random.Random, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def bind_tools(self, tools, *, tool_choice: Optional[Any] = None, **kwargs):
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def _draw(self) -> Tuple[float, bool]:
+        return self.behavior.latency(self.rng), self.rng.random() < self.behavior.failure_rate
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        latency, fail = self._draw()
+        time.sleep(latency)
+        return self._answer(messages, fail)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        latency, fail = self._draw()
+        await asyncio.sleep(latency)
+        return self._answer(messages, fail)
+
+    def _answer(self, messages: List[BaseMessage], fail: bool) -> ChatResult:
+        if fail:
+            raise FakeProviderError(f"injected failure from {self.model_name}")
+        text = "\n".join(_message_text(m) for m in messages)
+        ids = fights_in(text)
+        searches_done = sum(isinstance(m, ToolMessage) and m.name == "serper_search" for m in messages)
+        structured = next((name for name in self.tool_names if name in STRUCTURED_ANSWERS), None)
+        output_tokens = max(1, int(self.behavior.output_tokens * self.rng.uniform(0.8, 1.2)))
+
+        tool_call = None
+        if "serper_search" in self.tool_names and ids and searches_done < self.behavior.searches:
+            fighter1, fighter2 = FIGHT_BOOK[ids[searches_done % len(ids)]]
+            tool_call = ("serper_search", {"query": f"{fighter1} vs {fighter2} news"})
+            output_tokens = 20
+        elif structured and ids:
+            tool_call = (structured, STRUCTURED_ANSWERS[structured](ids, self.model_name))
+
+        if tool_call is not None:
+            name, args = tool_call
+            message = AIMessage(content="", tool_calls=[{
+                "name": name, "args": args, "id": f"call_{self.rng.getrandbits(32):08x}", "type": "tool_call"
+            }])
+            output_tokens = max(output_tokens, estimate_tokens(json.dumps(args)))
+        else:
+            message = AIMessage(content=self._essay(ids, output_tokens))
+
+        input_tokens = estimate_tokens(text)
+        message.usage_metadata = {
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _essay(self, ids: List[str], output_tokens: int) -> str:
+        lines = []
+        for fight_id in ids:
+            fighter1, fighter2 = FIGHT_BOOK[fight_id]
+            pick, confidence = _lean(fight_id, self.model_name)
+            lines.append(f"{fight_id}: {fighter1} vs {fighter2} - lean {pick} ({confidence}%).")
+        body = "\n".join(lines)
+        # pad to roughly the configured length so downstream prompts are realistically sized
+        missing = output_tokens - estimate_tokens(body)
+        if missing > 0:
+            body += "\n" + FILLER * (missing // max(1, estimate_tokens(FILLER)) + 1)
+        return body
+
+
+def load_behaviors(path: Optional[str]) -> Dict[str, FakeBehavior]:
+    """Per-model behaviors from a JSON profile; the ``"*"`` entry applies to every other model."""
+    if not path:
+        return {"*": FakeBehavior()}
+    with open(path) as f:
+        raw = json.load(f)
+    default = FakeBehavior(**raw.get("*", {}))
+    behaviors = {"*": default}
+    for model_name, overrides in raw.items():
+        if model_name != "*":
+            behaviors[model_name] = default.model_copy(update=overrides)
+    return behaviors
+
+
+def install_fake_llms(behaviors: Dict[str, FakeBehavior], seed: int = 0, time_scale: float = 1.0) -> Dict[str, FakeChatModel]:
+    """Make every agent built from now on run on a fake model; returns the fakes by model name."""
+    import app.agent_registry as agent_registry
+    import app.llm_providers as llm_providers
+
+    fakes: Dict[str, FakeChatModel] = {}
+
+    def fake_llm(model_name: str, temperature: float = 0.1) -> FakeChatModel:
+        if model_name not in fakes:
+            behavior = behaviors.get(model_name, behaviors["*"])
+            behavior = behavior.model_copy(update={"median": behavior.median * time_scale})
+            fakes[model_name] = FakeChatModel(model_name=model_name, behavior=behavior,
+                                              rng=random.Random(_seed(seed, model_name)))
+        return fakes[model_name]
+
+    agent_registry.get_llm = fake_llm
+    llm_providers.get_llm = fake_llm
+    agent_registry.registry.clear()
+    return fakes
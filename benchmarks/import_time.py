@@ -0,0 +1,151 @@
+"""Import-time and cold-start benchmark.
+
+Each run starts a fresh interpreter, imports ``app.main`` under
+``-X importtime`` and then builds the default agents the way the lifespan
+hook does. It reports the median time of both steps and the slowest module
+imports. It fails when a provider package or the ``langchain.agents``
+stack is loaded by the import alone, or when warm-up loads a provider that
+no model in AGENT_MODELS uses.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --save import-main
+    python -m benchmarks.import_time --compare benchmarks/baselines/import-main.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.run import BASELINE_DIR, BENCH_DIR, git_revision
+
+ROOT = os.path.dirname(BENCH_DIR)
+PROVIDER_PACKAGES = {
+    "openai": "langchain_openai",
+    "anthropic": "langchain_anthropic",
+    "google": "langchain_google_genai"
+}
+LAZY_MODULES = [*PROVIDER_PACKAGES.values(), "langchain.agents"]
+COMPARED = ["import_s", "warm_up_s"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+loaded_by_import = [m for m in {lazy!r} if m in sys.modules]
+from app.agents import warm_up_agents
+from app.config import AGENT_MODELS
+from app.llm_providers import provider_for_model
+warm_up_agents()
+warmed = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - started,
+    "warm_up_s": warmed - imported,
+    "loaded_by_import": loaded_by_import,
+    "loaded_by_warm_up": [p for p, m in {providers!r}.items() if m in sys.modules],
+    "expected_providers": sorted({{provider_for_model(m) for m in AGENT_MODELS.values()}})
+}}))
+"""
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--save", metavar="NAME", help="save results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=25.0, help="percent slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a regression is found")
+    return parser.parse_args(argv)
+
+
+def probe_once() -> Dict[str, Any]:
+    env = dict(os.environ, CASSETTE_MODE="off")
+    # warm-up constructs the chat models, which only need a key to be present
+    for var in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_API_KEY"):
+        env.setdefault(var, "import-benchmark")
+    code = PROBE.format(lazy=LAZY_MODULES, providers=PROVIDER_PACKAGES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise RuntimeError(f"probe failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = []
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue  # nested; already counted in its parent's cumulative time
+        imports.append((name.strip(), int(cumulative)))
+    result["imports"] = imports
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    probes = [probe_once() for _ in range(args.runs)]
+    last = probes[-1]
+    result = {
+        "import_s": round(statistics.median(p["import_s"] for p in probes), 4),
+        "warm_up_s": round(statistics.median(p["warm_up_s"] for p in probes), 4),
+        "loaded_by_import": last["loaded_by_import"],
+        "loaded_by_warm_up": last["loaded_by_warm_up"],
+        "slowest_imports": [
+            {"module": name, "ms": round(us / 1000, 1)}
+            for name, us in sorted(last["imports"], key=lambda item: -item[1])
+        ][:args.top]
+    }
+
+    print(f"import app.main   {result['import_s'] * 1000:8.1f} ms (median of {args.runs})")
+    print(f"warm_up_agents()  {result['warm_up_s'] * 1000:8.1f} ms, loaded providers: {', '.join(result['loaded_by_warm_up']) or '-'}")
+    print("\nslowest top-level imports:")
+    for entry in result["slowest_imports"]:
+        print(f"  {entry['ms']:8.1f} ms  {entry['module']}")
+
+    failures = [f"{m} is imported by 'import app.main'" for m in result["loaded_by_import"]]
+    failures += [f"warm-up loaded {PROVIDER_PACKAGES[p]} although no model in AGENT_MODELS uses {p}"
+                 for p in result["loaded_by_warm_up"] if p not in last["expected_providers"]]
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        report = {
+            "meta": {"name": args.save, **git_revision(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "python": platform.python_version(), "machine": platform.machine(), "runs": args.runs},
+            "result": result
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs baseline {baseline['meta'].get('name')} ({baseline['meta'].get('commit')}):")
+        for metric in COMPARED:
+            old, new = baseline["result"].get(metric), result[metric]
+            if not old:
+                continue
+            pct = (new - old) / old * 100
+            print(f"  {metric} {old * 1000:.1f} -> {new * 1000:.1f} ms ({pct:+.1f}%)")
+            if pct > args.threshold:
+                regressions.append(f"{metric} {pct:+.1f}%")
+
+    for failure in failures:
+        print(f"LAZY IMPORT BROKEN {failure}")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if failures or (regressions and args.fail_on_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
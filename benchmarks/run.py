@@ -0,0 +1,270 @@
+"""Offline benchmark for /analyze-card.
+
+Runs the real app in-process against fake chat models (benchmarks/fakes.py)
+and the Serper stub (dev/serper_stub.py), so the numbers measure
+orchestration overhead and concurrency scaling, not provider speed or spend.
+
+    python -m benchmarks.run                                  # default matrix
+    python -m benchmarks.run --sizes 14 --concurrency 1,8 --requests 40
+    python -m benchmarks.run --save main                      # writes benchmarks/baselines/main.json
+    python -m benchmarks.run --compare benchmarks/baselines/main.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+DEFAULT_PROFILE = os.path.join(BENCH_DIR, "profiles", "default.json")
+COMPARED = [("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    def ints(value: str) -> List[int]:
+        return [int(v) for v in value.split(",") if v.strip()]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=ints, default=[1, 5, 14, 30], help="fights per card, comma separated")
+    parser.add_argument("--concurrency", type=ints, default=[1, 4, 16], help="concurrent clients, comma separated")
+    parser.add_argument("--requests", type=int, default=32, help="requests per (size, concurrency) cell")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests before each cell")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="JSON file of per-model fake behaviors")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply every fake latency by this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serper", action="store_true", help="let analysis agents search (via the Serper stub)")
+    parser.add_argument("--serper-delay", type=float, default=0.02, help="seconds the Serper stub takes per search")
+    parser.add_argument("--card-options", default="{}",
+                        help='extra request body fields as JSON, e.g. \'{"shard_by_fight": true}\'')
+    parser.add_argument("--real-limits", action="store_true",
+                        help="keep the configured provider rate limits instead of lifting them")
+    parser.add_argument("--with-cache", action="store_true", help="keep the result and stage caches on")
+    parser.add_argument("--save", metavar="NAME", help="save results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a regression is found")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace):
+    """Settings are read at import time, so this has to run before anything under app/ is imported."""
+    os.environ.setdefault("SERPER_API_KEY", "benchmark")
+    os.environ.setdefault("SERPER_STUB_DELAY", str(args.serper_delay))
+    os.environ.setdefault("JOB_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-jobs-"), "jobs.db"))
+    if not args.with_cache:
+        os.environ["RESULT_CACHE_ENABLED"] = "false"
+        os.environ["STAGE_CACHE_ENABLED"] = "false"
+    if not args.real_limits:
+        for provider in ("OPENAI", "ANTHROPIC", "GOOGLE"):
+            os.environ[f"{provider}_RPM"] = "1000000"
+            os.environ[f"{provider}_TPM"] = "1000000000"
+
+
+def make_card(size: int, request_no: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    # unique fighters per request so no cache layer can answer for an earlier one
+    fights = [
+        {
+            "fight_id": f"b{request_no}-f{i}",
+            "fighter1": f"Red {request_no}-{i}",
+            "fighter2": f"Blue {request_no}-{i}",
+            "weight_class": "Lightweight",
+            "fighter1_record": "20-3-0",
+            "fighter2_record": "18-4-0"
+        }
+        for i in range(1, size + 1)
+    ]
+    return {"fights": fights, **options}
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class Runner:
+    def __init__(self, client, args: argparse.Namespace, options: Dict[str, Any]):
+        self.client = client
+        self.args = args
+        self.options = options
+        self.request_no = 0
+
+    def next_card(self, size: int) -> Dict[str, Any]:
+        from benchmarks.fakes import register_fights
+
+        self.request_no += 1
+        card = make_card(size, self.request_no, self.options)
+        register_fights(card["fights"])
+        return card
+
+    async def one(self, size: int) -> Dict[str, Any]:
+        card = self.next_card(size)
+        started = time.perf_counter()
+        try:
+            response = await self.client.post("/analyze-card", json=card)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        return {"ms": (time.perf_counter() - started) * 1000, "status": status}
+
+    async def cell(self, size: int, concurrency: int) -> Dict[str, Any]:
+        for _ in range(self.args.warmup):
+            await self.one(size)
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.args.requests):
+            queue.put_nowait(None)
+        outcomes: List[Dict[str, Any]] = []
+
+        async def client_loop():
+            while not queue.empty():
+                queue.get_nowait()
+                outcomes.append(await self.one(size))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+        ok = [o["ms"] for o in outcomes if o["status"] == 200]
+        errors: Dict[str, int] = {}
+        for o in outcomes:
+            if o["status"] != 200:
+                errors[str(o["status"])] = errors.get(str(o["status"]), 0) + 1
+
+        def r(value: Optional[float]) -> Optional[float]:
+            return round(value, 1) if value is not None else None
+
+        return {
+            "fights": size,
+            "concurrency": concurrency,
+            "requests": len(outcomes),
+            "ok": len(ok),
+            "errors": errors,
+            "wall_s": round(wall, 3),
+            "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+            "mean_ms": r(sum(ok) / len(ok)) if ok else None,
+            "p50_ms": r(percentile(ok, 50)),
+            "p95_ms": r(percentile(ok, 95)),
+            "p99_ms": r(percentile(ok, 99))
+        }
+
+
+async def run_matrix(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    import httpx
+    from dev import serper_stub
+    from app.main import app, lifespan
+    from app.serper import get_serper_client
+    from benchmarks.fakes import install_fake_llms, load_behaviors
+
+    install_fake_llms(load_behaviors(args.profile), seed=args.seed, time_scale=args.time_scale)
+    options = {"use_serper": args.serper, **json.loads(args.card_options)}
+    results = []
+    async with lifespan(app):
+        serper = get_serper_client()
+        serper._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=serper_stub.app), base_url="http://serper-stub")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            runner = Runner(client, args, options)
+            for size in args.sizes:
+                for concurrency in args.concurrency:
+                    result = await runner.cell(size, concurrency)
+                    print(format_row(result), flush=True)
+                    results.append(result)
+    return results
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*cmd: str) -> str:
+        try:
+            return subprocess.run(["git", *cmd], cwd=BENCH_DIR, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "app"))}
+
+
+HEADER = f"{'fights':>6} {'conc':>5} {'ok/req':>8} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors"
+
+
+def format_row(result: Dict[str, Any]) -> str:
+    def ms(value):
+        return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+    return (f"{result['fights']:>6} {result['concurrency']:>5} {result['ok']:>4}/{result['requests']:<3} "
+            f"{result['throughput_rps']:8.2f} {ms(result['p50_ms'])} {ms(result['p95_ms'])} {ms(result['p99_ms'])}  "
+            f"{result['errors'] or ''}")
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the change per cell against a baseline; returns the regressions beyond ``threshold`` percent."""
+    previous = {(r["fights"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nvs baseline {baseline['meta'].get('name')} ({baseline['meta'].get('commit')}):")
+    regressions = []
+    for result in results:
+        before = previous.get((result["fights"], result["concurrency"]))
+        if before is None:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            pct = (new - old) / old * 100
+            changes.append(f"{metric} {pct:+.1f}%")
+            if (-pct if higher_is_better else pct) > threshold:
+                regressions.append(f"{result['fights']} fights x{result['concurrency']}: {metric} {old} -> {new}")
+        print(f"{result['fights']:>6} {result['concurrency']:>5}  " + ", ".join(changes))
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level=os.getenv("BENCH_LOG_LEVEL", "ERROR"))
+
+    print(HEADER)
+    results = asyncio.run(run_matrix(args))
+    report = {
+        "meta": {
+            "name": args.save,
+            **git_revision(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "profile": os.path.relpath(args.profile, os.path.dirname(BENCH_DIR)) if args.profile else None,
+            "time_scale": args.time_scale,
+            "serper": args.serper,
+            "card_options": json.loads(args.card_options),
+            "requests_per_cell": args.requests
+        },
+        "results": results
+    }
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
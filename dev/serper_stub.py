@@ -0,0 +1,64 @@
+"""Local stand-in for the Serper search API.
+
+Run it and point the app at it to exercise web search without a key or network:
+
+    uvicorn dev.serper_stub:app --port 8765
+    SERPER_BASE_URL=http://127.0.0.1:8765 SERPER_API_KEY=stub uvicorn app.main:app
+
+``SERPER_STUB_DELAY`` (seconds) adds latency to every search, and
+``SERPER_STUB_FAIL_RATE`` (0-1) makes that share of searches return HTTP 500.
+"""
+import asyncio
+import os
+import random
+from fastapi import FastAPI, Header, HTTPException, Request
+
+app = FastAPI(title="Serper stub")
+
+DELAY = float(os.getenv("SERPER_STUB_DELAY", "0"))
+FAIL_RATE = float(os.getenv("SERPER_STUB_FAIL_RATE", "0"))
+
+app.state.calls = 0
+app.state.in_flight = 0
+app.state.max_in_flight = 0
+
+
+def fake_results(query: str, num: int) -> list:
+    slug = "-".join(query.lower().split())
+    return [
+        {
+            "position": i,
+            "title": f"{query} - result {i}",
+            "link": f"https://example.com/{slug}/{i}",
+            "snippet": f"Stub coverage #{i} for '{query}'.",
+            "date": "1 day ago"
+        }
+        for i in range(1, num + 1)
+    ]
+
+
+@app.post("/search")
+async def search(request: Request, x_api_key: str = Header(default="")):
+    app.state.calls += 1
+    if not x_api_key:
+        raise HTTPException(status_code=403, detail="Missing X-API-KEY")
+    payload = await request.json()
+    app.state.in_flight += 1
+    app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+    try:
+        if DELAY:
+            await asyncio.sleep(DELAY)
+    finally:
+        app.state.in_flight -= 1
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        raise HTTPException(status_code=500, detail="Injected failure")
+    query = payload.get("q", "")
+    return {
+        "searchParameters": {"q": query, "num": payload.get("num", 10)},
+        "organic": fake_results(query, int(payload.get("num", 10)))
+    }
+
+
+@app.get("/calls")
+async def calls():
+    return {"calls": app.state.calls, "max_in_flight": app.state.max_in_flight}
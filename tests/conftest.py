@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import time: keep tests off every shared cache and the real job store
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+os.environ["STAGE_CACHE_ENABLED"] = "false"
+os.environ["CASSETTE_MODE"] = "off"
+os.environ["JOB_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="ufc-tests-"), "jobs.db")
+
+import pytest
+import uvicorn
+from dev import serper_stub
+
+
+@pytest.fixture
+def fake_llms(monkeypatch):
+    """Install benchmark fakes for every model; returns the installer, undone after the test."""
+    import app.agent_registry as agent_registry
+    import app.llm_providers as llm_providers
+    from benchmarks.fakes import install_fake_llms
+
+    monkeypatch.setattr(agent_registry, "get_llm", agent_registry.get_llm)
+    monkeypatch.setattr(llm_providers, "get_llm", llm_providers.get_llm)
+    yield install_fake_llms
+    agent_registry.registry.clear()
+
+
+@pytest.fixture(scope="session")
+def serper_stub_server():
+    """dev/serper_stub.py served over real HTTP on a free local port; yields its base URL."""
+    server = uvicorn.Server(uvicorn.Config(serper_stub.app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Serper stub did not start")
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def serper_stub_url(serper_stub_server, monkeypatch):
+    """The stub's URL with its counters reset; tests may set ``serper_stub.DELAY`` freely."""
+    monkeypatch.setattr(serper_stub, "DELAY", 0.0)
+    monkeypatch.setattr(serper_stub, "FAIL_RATE", 0.0)
+    serper_stub.app.state.calls = 0
+    serper_stub.app.state.max_in_flight = 0
+    return serper_stub_server
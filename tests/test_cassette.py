@@ -0,0 +1,42 @@
+import asyncio
+import httpx
+import pytest
+from app.cassette import Cassette, ReplayedError
+from app.circuit_breaker import is_provider_error
+
+
+def cassette(tmp_path, mode):
+    return Cassette({"mode": mode, "path": str(tmp_path / "cassette.jsonl"), "timing": "none",
+                     "time_scale": 0.1, "on_miss": "error"})
+
+
+def record_and_replay(tmp_path, error: Exception) -> ReplayedError:
+    async def fail():
+        raise error
+
+    with pytest.raises(type(error)):
+        asyncio.run(cassette(tmp_path, "record").call("llm", {"prompt": "x"}, fail))
+    with pytest.raises(ReplayedError) as replayed:
+        asyncio.run(cassette(tmp_path, "replay").call("llm", {"prompt": "x"}, fail))
+    return replayed.value
+
+
+def test_replayed_server_error_keeps_its_status(tmp_path):
+    request = httpx.Request("POST", "https://provider.test/v1")
+    error = httpx.HTTPStatusError("overloaded", request=request, response=httpx.Response(503, request=request))
+
+    replayed = record_and_replay(tmp_path, error)
+    assert replayed.status_code == 503
+    assert replayed.error_type == "HTTPStatusError"
+    assert is_provider_error(replayed)
+
+
+def test_replayed_timeout_still_counts_as_a_provider_error(tmp_path):
+    replayed = record_and_replay(tmp_path, httpx.ReadTimeout("slow"))
+    assert replayed.status_code is None and replayed.error_type == "ReadTimeout"
+    assert is_provider_error(replayed)
+
+
+def test_replayed_local_error_does_not(tmp_path):
+    replayed = record_and_replay(tmp_path, ValueError("bad output"))
+    assert not is_provider_error(replayed)
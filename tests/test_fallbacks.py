@@ -0,0 +1,51 @@
+import asyncio
+import httpx
+import pytest
+import app.circuit_breaker
+import app.stage_cache
+from benchmarks.fakes import FakeBehavior, FakeProviderError, register_fights
+from app.circuit_breaker import is_provider_error
+from app.config import STAGE_CACHE_SETTINGS
+from app.models import Card
+from app.pipeline import run_pipeline
+from app.stage_cache import StageCache
+
+FAILING = "claude-3-7-sonnet-20250219"
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.example.com/v1/messages")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.mark.parametrize("error, counted", [
+    (asyncio.TimeoutError(), True),
+    (httpx.ConnectError("refused"), True),
+    (status_error(429), True),
+    (status_error(503), True),
+    (FakeProviderError("down"), True),
+    (status_error(400), False),
+    (ValueError("invalid verdict for f1: confidence out of range"), False),
+    (KeyError("structured_response"), False),
+])
+def test_only_provider_errors_count_against_the_breaker(error, counted):
+    assert is_provider_error(error) is counted
+
+
+def test_fallback_outputs_are_not_cached_under_the_primary_model(fake_llms, monkeypatch):
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0), FAILING: FakeBehavior(median=0.01, spread=0, failure_rate=1.0)})
+    monkeypatch.setattr(app.circuit_breaker, "_breakers", None)
+    monkeypatch.setitem(STAGE_CACHE_SETTINGS, "enabled", True)
+    monkeypatch.setitem(STAGE_CACHE_SETTINGS, "backend", "memory")
+    monkeypatch.setattr(app.stage_cache, "_stage_cache", StageCache())
+    card = Card(fights=[{"fight_id": "fallback-1", "fighter1": "Red Fallback", "fighter2": "Blue Fallback", "weight_class": "Lightweight"}])
+    register_fights([fight.model_dump() for fight in card.fights])
+
+    first = asyncio.run(run_pipeline(card))
+    assert f"tape_study:{FAILING}->gpt-5" in first.substituted_models
+    assert not first.cacheable
+
+    second = asyncio.run(run_pipeline(card))
+    # stages answered by their requested model are reused, the fallback ones run again
+    assert "stats_trends" in second.reused_stages
+    assert {"tape_study", "style_matchup"} <= set(second.recomputed_stages)
@@ -0,0 +1,23 @@
+import asyncio
+import time
+from benchmarks.fakes import FakeBehavior, register_fights
+from app.models import Card
+from app.pipeline import ANALYSIS_AGENT_TYPES, run_card_analysis
+
+AGENT_SECONDS = 0.5
+
+
+def test_analysis_agents_overlap(fake_llms):
+    # every model answers after exactly AGENT_SECONDS
+    fake_llms({"*": FakeBehavior(median=AGENT_SECONDS, spread=0)})
+    card = Card(fights=[{"fight_id": "fanout-1", "fighter1": "Red Fanout", "fighter2": "Blue Fanout", "weight_class": "Lightweight"}])
+    register_fights([fight.model_dump() for fight in card.fights])
+
+    started = time.perf_counter()
+    outputs, dropped = asyncio.run(run_card_analysis(card))
+    elapsed = time.perf_counter() - started
+
+    assert sorted(outputs) == sorted(ANALYSIS_AGENT_TYPES) and not dropped
+    assert all("Red Fanout" in output for output in outputs.values())
+    # sequential would take len(ANALYSIS_AGENT_TYPES) * AGENT_SECONDS
+    assert elapsed < 2 * AGENT_SECONDS, f"fan-out took {elapsed:.2f}s"
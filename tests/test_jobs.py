@@ -0,0 +1,49 @@
+import asyncio
+import os
+from benchmarks.fakes import FakeBehavior, register_fights
+from app import pipeline
+from app.jobs import CANCELLED, RUNNING, SUCCEEDED, JobManager, JobStore
+from app.models import Card
+
+FIGHT = {"fight_id": "jobs-1", "fighter1": "Red Jobs", "fighter2": "Blue Jobs", "weight_class": "Lightweight"}
+
+
+def test_terminal_update_does_not_overwrite_a_cancel(tmp_path):
+    store = JobStore(os.path.join(tmp_path, "jobs.db"))
+    job_id = store.create(Card(fights=[FIGHT]))
+    store.claim_next()
+    store.update(job_id, status=CANCELLED)
+
+    assert not store.update(job_id, only_if=RUNNING, status=SUCCEEDED, result="{}")
+    assert store.get(job_id)["status"] == CANCELLED
+    store.close()
+
+
+def test_job_reports_failed_agents(tmp_path, fake_llms, monkeypatch):
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0)})
+    register_fights([FIGHT])
+    run_analysis_agent = pipeline.run_analysis_agent
+
+    async def market_odds_down(agent_type, *args, **kwargs):
+        if agent_type == "market_odds":
+            return "Analysis failed for market_odds: provider down"
+        return await run_analysis_agent(agent_type, *args, **kwargs)
+    monkeypatch.setattr(pipeline, "run_analysis_agent", market_odds_down)
+
+    async def run():
+        manager = JobManager(path=os.path.join(tmp_path, "jobs.db"), workers=1)
+        await manager.start()
+        job_id = manager.submit(Card(fights=[FIGHT]))
+        info = manager.get(job_id)
+        for _ in range(500):
+            if info.status not in ("queued", "running"):
+                break
+            await asyncio.sleep(0.01)
+            info = manager.get(job_id)
+        await manager.stop()
+        return info
+
+    info = asyncio.run(run())
+    assert info.status == SUCCEEDED
+    assert info.failed_agents == info.result.failed_agents == ["market_odds"]
+    assert info.dropped_agents is None
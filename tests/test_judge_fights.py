@@ -0,0 +1,68 @@
+import asyncio
+import app.circuit_breaker
+import app.config
+from benchmarks.fakes import FakeBehavior, fight_analysis, fight_evidence, register_fights
+from app.evidence import format_evidence
+from app.models import AgentEvidence, Card, Fight
+from app.pipeline import essay_for_fight, merge_fight_outputs, run_pipeline, run_post_stage
+
+FIGHTS = [
+    Fight(fight_id="main", fighter1="Ilia Topuria", fighter2="Max Holloway", weight_class="Featherweight"),
+    Fight(fight_id="co-main", fighter1="Merab Dvalishvili", fighter2="Umar Nurmagomedov", weight_class="Bantamweight"),
+]
+
+
+def test_sharded_output_is_cut_at_fight_headers():
+    output = merge_fight_outputs({"main": "Topuria by KO.", "co-main": "Merab on pressure."})
+    assert essay_for_fight(output, FIGHTS[0], FIGHTS) == "Topuria by KO."
+    assert essay_for_fight(output, FIGHTS[1], FIGHTS) == "Merab on pressure."
+
+
+def test_whole_card_essay_keeps_only_the_fights_own_section():
+    essay = "\n".join([
+        "## Ilia Topuria vs Max Holloway",
+        "Counter-punching edge in the pocket.",
+        "## Dvalishvili vs Nurmagomedov",
+        "Relentless wrestling pace.",
+    ])
+    main = essay_for_fight(essay, FIGHTS[0], FIGHTS)
+    co_main = essay_for_fight(essay, FIGHTS[1], FIGHTS)
+    assert "Counter-punching" in main and "wrestling" not in main
+    assert "wrestling" in co_main and "Counter-punching" not in co_main
+
+
+def test_essay_that_never_names_the_fight_is_kept_whole():
+    essay = "Both title fights look competitive."
+    assert essay_for_fight(essay, FIGHTS[0], FIGHTS) == essay
+
+
+def test_post_stages_only_cover_judged_fights(fake_llms):
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0)})
+    card = Card(fights=[fight.model_dump() for fight in FIGHTS])
+    register_fights([fight.model_dump() for fight in FIGHTS])
+    judged = [fight_analysis("main", "judge")]
+
+    for stage in ("risk_scorer", "consistency_checker"):
+        analyses, degraded = asyncio.run(run_post_stage(stage, card, judged))
+        assert degraded is None
+        assert [analysis["fight_id"] for analysis in analyses] == ["main"]
+
+
+def test_failed_post_stage_is_reported_and_not_cacheable(fake_llms, monkeypatch):
+    failing = "gpt-5-mini"
+    monkeypatch.setattr(app.config, "FALLBACKS_ENABLED", False)
+    monkeypatch.setattr(app.circuit_breaker, "_breakers", None)
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0), failing: FakeBehavior(median=0.01, spread=0, failure_rate=1.0)})
+    card = Card(fights=[FIGHTS[0].model_dump()], agent_models={"risk_scorer": failing})
+    register_fights([FIGHTS[0].model_dump()])
+
+    result = asyncio.run(run_pipeline(card))
+    assert "risk_scorer" in result.failed_agents
+    assert not result.cacheable
+
+
+def test_whole_card_evidence_names_the_fighters():
+    evidence = {"tape_study": AgentEvidence(fights=[fight_evidence("main", "gpt-5")])}
+    text = format_evidence(evidence, FIGHTS)
+    assert "main: Ilia Topuria vs Max Holloway" in text
+    assert "co-main: Merab Dvalishvili vs Umar Nurmagomedov" in text and "(no evidence)" in text
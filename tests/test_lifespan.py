@@ -0,0 +1,22 @@
+import asyncio
+import app.jobs
+from benchmarks.fakes import FakeBehavior
+from app.agent_registry import get_agent, registry
+from app.agents import system_prompt_for
+from app.main import app as api, lifespan
+
+
+def test_shutdown_drops_agents_bound_to_closed_clients(fake_llms, monkeypatch):
+    fake_llms({"*": FakeBehavior()})
+    monkeypatch.setattr("app.main.warm_up_agents", lambda include_search: 0)
+    monkeypatch.setattr(app.jobs, "_job_manager", None)
+
+    async def run():
+        async with lifespan(api):
+            agent = get_agent("market_odds", "gpt-5-mini", system_prompt_for("market_odds"))
+            assert len(registry) == 1
+        return agent
+
+    before = asyncio.run(run())
+    assert len(registry) == 0
+    assert get_agent("market_odds", "gpt-5-mini", system_prompt_for("market_odds")) is not before
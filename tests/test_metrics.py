@@ -0,0 +1,31 @@
+import asyncio
+import httpx
+import app.main
+from app.main import app as api
+from app.metrics import REQUESTS_IN_FLIGHT
+
+ENDPOINT = "/analyze-card/stream"
+
+
+def in_flight() -> float:
+    return REQUESTS_IN_FLIGHT.labels(ENDPOINT)._value.get()
+
+
+def test_streamed_request_stays_in_flight_until_the_body_is_sent(monkeypatch):
+    async def fake_stream_events(produce, sse=False):
+        # sampled while the body is being sent, after the endpoint has returned
+        for _ in range(3):
+            await asyncio.sleep(0)
+            yield f"{in_flight()}\n"
+
+    monkeypatch.setattr(app.main, "stream_events", fake_stream_events)
+    fight = {"fight_id": "gauge-1", "fighter1": "Red Gauge", "fighter2": "Blue Gauge", "weight_class": "Flyweight"}
+    before = in_flight()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+            return await client.post(ENDPOINT, json={"fights": [fight]})
+
+    response = asyncio.run(run())
+    assert [float(line) for line in response.text.splitlines()] == [before + 1] * 3
+    assert in_flight() == before
@@ -0,0 +1,11 @@
+from app.agents import system_prompt_for
+from app.prompt_cache import cached_system_message, uses_cache_breakpoint
+
+
+def test_every_claude_call_carries_a_breakpoint():
+    # the shipped prompts are under 1024 estimated tokens; no size gate may skip them
+    assert uses_cache_breakpoint("claude-3-7-sonnet-20250219")
+    assert uses_cache_breakpoint("claude-3-5-haiku-20241022")
+    assert not uses_cache_breakpoint("gpt-5")
+    message = cached_system_message(system_prompt_for("tape_study"))
+    assert message.content[0]["cache_control"] == {"type": "ephemeral"}
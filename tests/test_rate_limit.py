@@ -0,0 +1,33 @@
+import asyncio
+import app.rate_limit
+import app.serper
+from benchmarks.fakes import FakeBehavior, register_fights
+from app.agents import is_failed_output, run_analysis_agent
+from app.config import MODEL_RATE_LIMITS
+from app.models import Card
+from app.rate_limit import get_rate_limiter
+from app.serper import SerperClient
+
+SEARCHES = 2
+
+
+def test_every_provider_request_is_charged(fake_llms, serper_stub_url, monkeypatch):
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0, searches=SEARCHES)})
+    card = Card(fights=[{"fight_id": "limits-1", "fighter1": "Red Limits", "fighter2": "Blue Limits", "weight_class": "Lightweight"}])
+    register_fights([fight.model_dump() for fight in card.fights])
+    monkeypatch.setitem(MODEL_RATE_LIMITS, "gpt-4o", {"rpm": 1000, "tpm": 1000000})
+    monkeypatch.setattr(app.rate_limit, "_rate_limiter", None)
+
+    async def run():
+        client = SerperClient(api_key="test", base_url=serper_stub_url)
+        monkeypatch.setattr(app.serper, "_client", client)
+        try:
+            return await run_analysis_agent("news_weighins", card, "gpt-4o", use_serper=True)
+        finally:
+            await client.aclose()
+
+    output = asyncio.run(run())
+    assert not is_failed_output(output), output
+    # one request per search the model asks for, plus the one that writes the answer
+    limiter = get_rate_limiter().limiters_for("gpt-4o")[0]
+    assert limiter.acquired == SEARCHES + 1
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import httpx
+import pytest
+import app.result_cache
+from benchmarks.fakes import FakeBehavior, register_fights
+from app.config import RESULT_CACHE_SETTINGS, STAGE_CACHE_SETTINGS
+from app.main import app as api
+from app.result_cache import ResultCache, card_cache_key, ttl_for_card
+from app.models import Card
+
+FIGHT = {"fight_id": "cache-1", "fighter1": "Red Cache", "fighter2": "Blue Cache", "weight_class": "Lightweight"}
+
+
+@pytest.fixture
+def result_cache(fake_llms, monkeypatch):
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0)})
+    register_fights([FIGHT])
+    monkeypatch.setitem(RESULT_CACHE_SETTINGS, "enabled", True)
+    monkeypatch.setitem(RESULT_CACHE_SETTINGS, "backend", "memory")
+    cache = ResultCache()
+    monkeypatch.setattr(app.result_cache, "_result_cache", cache)
+    return cache
+
+
+def stream(card: dict, cache_control: str = "") -> dict:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+            headers = {"cache-control": cache_control} if cache_control else {}
+            response = await client.post("/analyze-card/stream", json=card, headers=headers)
+        return json.loads(response.text.strip().splitlines()[-1])
+    return asyncio.run(run())
+
+
+def test_stream_honours_no_store(result_cache):
+    card = {"fights": [FIGHT]}
+    key = card_cache_key(Card(**card))
+
+    result = stream(card, "no-store")
+    assert result["event"] == "result" and result["stored"] is False
+    assert result_cache.get(key) is None
+
+    result = stream(card)
+    assert result["stored"] is True
+    assert result_cache.get(key) is not None
+
+
+def test_search_backed_results_expire_with_their_searches():
+    assert ttl_for_card(Card(fights=[FIGHT])) is None
+    assert ttl_for_card(Card(fights=[FIGHT], use_serper=True)) == STAGE_CACHE_SETTINGS["search_ttl"]
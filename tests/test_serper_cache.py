@@ -0,0 +1,69 @@
+import asyncio
+import app.cache
+from types import SimpleNamespace
+from dev import serper_stub
+from app.serper import SerperClient, ttl_for_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_news_entries_expire_before_profile_entries(serper_stub_url, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app.cache, "time", SimpleNamespace(monotonic=clock.monotonic))
+    news, profile = "Topuria injury news", "Topuria career record"
+    assert ttl_for_query(news.lower()) < ttl_for_query(profile.lower())
+    client = SerperClient(api_key="test", base_url=serper_stub_url)
+
+    async def run():
+        await client.search(news)
+        await client.search(profile)
+        clock.now += ttl_for_query(news.lower()) + 1
+        await client.search(news)
+        await client.search(profile)
+        await client.aclose()
+
+    asyncio.run(run())
+    # the news entry was refetched, the profile entry still served from cache
+    assert serper_stub.app.state.calls == 3
+    assert client.cache.stats()["expirations"] == 1
+
+
+def test_concurrent_identical_queries_share_one_upstream_call(serper_stub_url, monkeypatch):
+    monkeypatch.setattr(serper_stub, "DELAY", 0.2)
+    client = SerperClient(api_key="test", base_url=serper_stub_url)
+
+    async def run():
+        # spelling variants normalize to the same key
+        queries = ["Ilia Topuria", "ilia topuria", "  Ilia   Topuria!"] * 3
+        try:
+            return await asyncio.gather(*(client.search(q) for q in queries))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+    assert serper_stub.app.state.calls == 1
+    assert all(r == results[0] for r in results)
+    assert client.stats()["coalesced"] == 8
+
+
+def test_hit_and_miss_counters(serper_stub_url):
+    client = SerperClient(api_key="test", base_url=serper_stub_url)
+
+    async def run():
+        await client.search("Merab Dvalishvili")
+        await client.search("merab dvalishvili")
+        await client.search("Merab Dvalishvili")
+        await client.search("Umar Nurmagomedov")
+        await client.aclose()
+
+    asyncio.run(run())
+    stats = client.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert stats["hit_rate"] == 0.5
+    assert stats["upstream_calls"] == serper_stub.app.state.calls == 2
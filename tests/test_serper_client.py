@@ -0,0 +1,73 @@
+import asyncio
+import httpx
+import pytest
+from dev import serper_stub
+from app.config import SERPER_SETTINGS
+from app.serper import SearchResult, SerperClient, SerperNotConfigured, format_results
+
+
+async def close_after(client: SerperClient, coro):
+    try:
+        return await coro
+    finally:
+        await client.aclose()
+
+
+def test_parses_structured_results(serper_stub_url):
+    client = SerperClient(api_key="test", base_url=serper_stub_url)
+    results = asyncio.run(close_after(client, client.search("Ilia Topuria", num=3)))
+
+    assert [r.position for r in results] == [1, 2, 3]
+    assert all(isinstance(r, SearchResult) for r in results)
+    assert results[0].title == "Ilia Topuria - result 1"
+    assert results[0].link == "https://example.com/ilia-topuria/1"
+    assert "1. Ilia Topuria - result 1" in format_results(results)
+
+
+def test_missing_key_is_reported_without_a_request(serper_stub_url, monkeypatch):
+    monkeypatch.setattr("app.serper.get_api_key", lambda provider: None)
+    client = SerperClient(base_url=serper_stub_url)
+    with pytest.raises(SerperNotConfigured):
+        asyncio.run(close_after(client, client.search("anything")))
+    assert serper_stub.app.state.calls == 0
+
+
+def test_semaphore_caps_concurrent_searches(serper_stub_url, monkeypatch):
+    monkeypatch.setattr(serper_stub, "DELAY", 0.2)
+    client = SerperClient(api_key="test", base_url=serper_stub_url, max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(client.search(f"distinct query {i}") for i in range(6)))
+
+    results = asyncio.run(close_after(client, run()))
+    assert len(results) == 6 and client.upstream_calls == 6
+    assert serper_stub.app.state.max_in_flight == 2
+
+
+def test_read_timeout(serper_stub_url, monkeypatch):
+    monkeypatch.setattr(serper_stub, "DELAY", 1.0)
+    monkeypatch.setitem(SERPER_SETTINGS, "request_timeout", 0.1)
+    client = SerperClient(api_key="test", base_url=serper_stub_url)
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(close_after(client, client.search("slow upstream")))
+
+
+def test_total_timeout_includes_waiting_for_a_slot(serper_stub_url, monkeypatch):
+    monkeypatch.setattr(serper_stub, "DELAY", 0.4)
+    client = SerperClient(api_key="test", base_url=serper_stub_url, max_concurrency=1, total_timeout=0.6)
+
+    async def run():
+        return await asyncio.gather(client.search("first"), client.search("second"), return_exceptions=True)
+
+    first, second = asyncio.run(close_after(client, run()))
+    assert isinstance(first, list)
+    # the second search waits ~0.4s for the only slot, then overruns the 0.6s total
+    assert isinstance(second, asyncio.TimeoutError)
+
+
+def test_connect_timeout_comes_from_settings(monkeypatch):
+    monkeypatch.setitem(SERPER_SETTINGS, "connect_timeout", 0.25)
+    monkeypatch.setitem(SERPER_SETTINGS, "request_timeout", 4.0)
+    client = SerperClient(api_key="test", base_url="http://127.0.0.1:9")
+    assert client.client.timeout.connect == 0.25
+    assert client.client.timeout.read == 4.0
@@ -0,0 +1,54 @@
+import asyncio
+import app.cache
+from types import SimpleNamespace
+from app.config import STAGE_CACHE_SETTINGS
+from app.stage_cache import StageCache, StageTracker
+
+
+def memory_stage_cache(monkeypatch) -> StageCache:
+    monkeypatch.setitem(STAGE_CACHE_SETTINGS, "enabled", True)
+    monkeypatch.setitem(STAGE_CACHE_SETTINGS, "backend", "memory")
+    return StageCache()
+
+
+def counting_compute():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return f"output {len(calls)}"
+    return compute, calls
+
+
+def test_refresh_skips_reads_but_stores_the_fresh_output(monkeypatch):
+    cache = memory_stage_cache(monkeypatch)
+    compute, calls = counting_compute()
+
+    async def run():
+        first = await cache.run("tape_study", "gpt-4o", {"fights": []}, compute, StageTracker())
+        refreshed = await cache.run("tape_study", "gpt-4o", {"fights": []}, compute, StageTracker(refresh=True))
+        again = await cache.run("tape_study", "gpt-4o", {"fights": []}, compute, StageTracker())
+        return first, refreshed, again
+
+    first, refreshed, again = asyncio.run(run())
+    assert first == ("output 1", False)
+    assert refreshed == ("output 2", False)
+    assert again == ("output 2", True)
+    assert len(calls) == 2
+
+
+def test_entry_ttl_overrides_the_default(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(app.cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    cache = memory_stage_cache(monkeypatch)
+    compute, calls = counting_compute()
+
+    async def run(stage, ttl=None):
+        return await cache.run(stage, "gpt-4o", {"use_serper": True}, compute, ttl=ttl)
+
+    asyncio.run(run("news_weighins", ttl=STAGE_CACHE_SETTINGS["search_ttl"]))
+    asyncio.run(run("stats_trends"))
+    clock.now += STAGE_CACHE_SETTINGS["search_ttl"] + 1
+    assert asyncio.run(run("news_weighins", ttl=STAGE_CACHE_SETTINGS["search_ttl"]))[1] is False
+    assert asyncio.run(run("stats_trends"))[1] is True
+    assert len(calls) == 3
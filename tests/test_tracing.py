@@ -0,0 +1,24 @@
+import asyncio
+import httpx
+from benchmarks.fakes import FakeBehavior, register_fights
+from app.config import PROFILE_SETTINGS
+from app.main import app as api
+
+FIGHT = {"fight_id": "trace-1", "fighter1": "Red Trace", "fighter2": "Blue Trace", "weight_class": "Welterweight"}
+
+
+def test_profile_header_names_a_trace_served_by_the_api(fake_llms, tmp_path, monkeypatch):
+    fake_llms({"*": FakeBehavior(median=0.01, spread=0)})
+    register_fights([FIGHT])
+    monkeypatch.setitem(PROFILE_SETTINGS, "dir", str(tmp_path))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as client:
+            analyzed = await client.post("/analyze-card?profile=true", json={"fights": [FIGHT]})
+            name = analyzed.headers["x-profile-trace"]
+            return name, await client.get(f"/traces/{name}"), await client.get("/traces/..%2Fjobs.db")
+
+    name, trace, outside = asyncio.run(run())
+    assert "/" not in name and str(tmp_path) not in name
+    assert trace.status_code == 200 and trace.json()["traceEvents"]
+    assert outside.status_code == 404